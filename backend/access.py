@@ -0,0 +1,141 @@
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import LRUCache
+from config import settings
+from db import Base
+from helpers import not_found
+from models import Pet
+
+T = TypeVar("T", bound=Base)
+
+# pet_id -> user_id. Владелец питомца не меняется, поэтому запись
+# достаточно удалить при удалении питомца (forget_pet). Другие воркеры
+# узнают об удалении через change_bus с Redis-транспортом, без него —
+# по TTL; до этого их запись защищает внешний ключ (pet_writes).
+pet_owners = LRUCache(settings.pet_owner_cache_size, settings.pet_owner_cache_ttl)
+
+# MySQL: Cannot add or update a child row: a foreign key constraint fails
+MYSQL_FK_VIOLATION = 1452
+
+
+def forget_pet(pet_id: str) -> None:
+    pet_owners.pop(pet_id)
+
+
+def _missing_parent(exc: IntegrityError) -> bool:
+    """Нарушен внешний ключ (строки-родителя нет), а не уникальность и т.п."""
+    args = getattr(exc.orig, "args", ())
+    if args and args[0] == MYSQL_FK_VIOLATION:
+        return True
+    return "FOREIGN KEY constraint failed" in str(exc.orig)
+
+
+async def get_owned_pet(
+    session: AsyncSession, pet_id: str, user_id: uuid.UUID
+) -> Pet:
+    """Питомец пользователя одним запросом; 404 если нет или чужой."""
+    result = await session.execute(
+        select(Pet).where(Pet.id == pet_id, Pet.user_id == user_id)
+    )
+    pet = result.scalar_one_or_none()
+    if pet is None:
+        not_found("Pet")
+
+    pet_owners.set(pet.id, pet.user_id)
+    return pet
+
+
+async def ensure_pet_access(
+    session: AsyncSession, pet_id: str, user_id: uuid.UUID
+) -> None:
+    """
+    Проверка владения без загрузки питомца.
+    При попадании в кэш запросов к БД нет.
+    """
+    owner_id = pet_owners.get(pet_id)
+    if owner_id is None:
+        owner_id = await session.scalar(
+            select(Pet.user_id).where(Pet.id == pet_id)
+        )
+        if owner_id is not None:
+            pet_owners.set(pet_id, owner_id)
+
+    if owner_id != user_id:
+        not_found("Pet")
+
+
+@asynccontextmanager
+async def pet_writes(session: AsyncSession, *pet_ids: str) -> AsyncIterator[None]:
+    """
+    Вставка и commit дочерних строк питомцев после ensure_pet_access.
+    Если питомца уже удалили, а кэш воркера этого не знает, вставку
+    отклоняет внешний ключ — тогда запись кэша удаляется и ответ 404.
+    Остальные нарушения ограничений пробрасываются как есть.
+    """
+    try:
+        yield
+    except IntegrityError as exc:
+        if not _missing_parent(exc):
+            raise
+        await session.rollback()
+        for pet_id in pet_ids:
+            forget_pet(pet_id)
+        not_found("Pet")
+
+
+async def owned_pet_ids(
+    session: AsyncSession, pet_ids: set[str], user_id: uuid.UUID
+) -> set[str]:
+    """Какие из pet_ids принадлежат пользователю — не больше одного запроса."""
+    owned = {pet_id for pet_id in pet_ids if pet_owners.get(pet_id) == user_id}
+    unknown = pet_ids - owned
+    if unknown:
+        result = await session.execute(
+            select(Pet.id).where(Pet.id.in_(unknown), Pet.user_id == user_id)
+        )
+        for pet_id in result.scalars():
+            pet_owners.set(pet_id, user_id)
+            owned.add(pet_id)
+    return owned
+
+
+async def find_owned(
+    session: AsyncSession,
+    model: type[T],
+    entity_id: str,
+    user_id: uuid.UUID,
+) -> T | None:
+    """
+    Дочерняя сущность питомца (событие, привычка, запись) одним запросом
+    с JOIN на pets по владельцу. Чужие и несуществующие — None.
+    """
+    result = await session.execute(
+        select(model)
+        .join(Pet, Pet.id == model.pet_id)
+        .where(model.id == entity_id, Pet.user_id == user_id)
+    )
+    obj = result.scalar_one_or_none()
+    if obj is not None:
+        pet_owners.set(obj.pet_id, user_id)
+    return obj
+
+
+async def get_owned(
+    session: AsyncSession,
+    model: type[T],
+    entity_id: str,
+    user_id: uuid.UUID,
+    entity: str,
+) -> T:
+    """То же, что find_owned, но чужие и несуществующие — 404."""
+    obj = await find_owned(session, model, entity_id, user_id)
+    if obj is None:
+        not_found(entity)
+    return obj
@@ -0,0 +1,217 @@
+"""
+Архив завершённых событий.
+
+Разовые события со статусом done / cancelled, начавшиеся раньше
+archive_cutoff(), EventArchiver периодически переносит пачками
+из events в events_archive. Горячая таблица держит только будущее
+и недавнее прошлое, её размер на пользователя не растёт со временем.
+
+Чтение: архив попадает в выборку, только если окно начинается раньше
+порога (reaches_archive) — календарь на «сейчас» в него не ходит.
+Изменение архивного события (get_owned_event) сначала возвращает его
+в events; если оно снова подходит под перенос, архиватор заберёт его позже.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from access import find_owned
+from config import settings
+from db import SessionLocal
+from helpers import not_found
+from models import Event, EventArchive, Pet
+
+log = logging.getLogger("petify.archive")
+
+ARCHIVE_STATUSES = ("done", "cancelled")
+
+# Колонки events, переносимые в архив как есть
+COLUMNS = tuple(column.key for column in Event.__table__.columns)
+
+
+def archive_cutoff(now: datetime | None = None) -> datetime:
+    """События, начавшиеся раньше, могут быть в архиве."""
+    return (now or datetime.utcnow()) - timedelta(days=settings.archive_after_days)
+
+
+def reaches_archive(window_start: datetime | None, status: str | None = None) -> bool:
+    """Нужен ли архив выборке, начинающейся с window_start (None — с начала)."""
+    if status is not None and status not in ARCHIVE_STATUSES:
+        return False
+    return window_start is None or window_start < archive_cutoff()
+
+
+# =========================
+# Reads / writes of single events
+# =========================
+
+async def get_owned_any(
+    session: AsyncSession, event_id: str, user_id: uuid.UUID
+) -> Event | EventArchive:
+    """Событие пользователя из горячей таблицы или архива; 404 если нет."""
+    event = await find_owned(session, Event, event_id, user_id)
+    if event is None:
+        event = await find_owned(session, EventArchive, event_id, user_id)
+    if event is None:
+        not_found("Event")
+    return event
+
+
+async def get_owned_event(
+    session: AsyncSession, event_id: str, user_id: uuid.UUID
+) -> Event:
+    """
+    Событие для изменения. Архивное возвращается в events в той же
+    транзакции (INSERT + DELETE при flush).
+    """
+    event = await get_owned_any(session, event_id, user_id)
+    if isinstance(event, Event):
+        return event
+
+    restored = Event(**{key: getattr(event, key) for key in COLUMNS})
+    session.add(restored)
+    await session.delete(event)
+    return restored
+
+
+# =========================
+# Moving rows
+# =========================
+
+def _candidates(cutoff: datetime):
+    return (
+        Event.status.in_(ARCHIVE_STATUSES),
+        Event.recurrence.is_(None),
+        Event.start_at < cutoff,
+    )
+
+
+async def archive_batch(session: AsyncSession, cutoff: datetime, limit: int) -> int:
+    """До limit событий в архив, без commit. Сколько перенесено."""
+    event_ids = (
+        await session.scalars(
+            select(Event.id).where(*_candidates(cutoff)).limit(limit)
+        )
+    ).all()
+    if not event_ids:
+        return 0
+
+    # Условия повторяются: событие могли изменить после выбора id
+    moved = select(
+        *(getattr(Event, key) for key in COLUMNS),
+        literal(datetime.utcnow()).label("archived_at"),
+    ).where(Event.id.in_(event_ids), *_candidates(cutoff))
+    await session.execute(
+        insert(EventArchive).from_select([*COLUMNS, "archived_at"], moved)
+    )
+    result = await session.execute(
+        delete(Event)
+        .where(Event.id.in_(event_ids), *_candidates(cutoff))
+        .execution_options(synchronize_session=False)
+    )
+    # Изменённые после выбора id не перенесены и не считаются
+    return result.rowcount
+
+
+async def table_sizes(session: AsyncSession) -> dict:
+    hot = await session.scalar(select(func.count()).select_from(Event))
+    archived = await session.scalar(select(func.count()).select_from(EventArchive))
+    # Активные — пользователи с событиями в горячей таблице
+    users = await session.scalar(
+        select(func.count(func.distinct(Pet.user_id))).join(Event, Event.pet_id == Pet.id)
+    )
+    return {
+        "hot": hot,
+        "archive": archived,
+        "active_users": users,
+        "hot_per_active_user": round(hot / users, 1) if users else 0.0,
+    }
+
+
+# =========================
+# Archiver
+# =========================
+
+class EventArchiver:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        interval: float,
+        batch_size: int,
+        pause: float,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._task: asyncio.Task | None = None
+
+        self.runs = 0
+        self.archived = 0
+        self.failed = 0
+        self.last_run: datetime | None = None
+
+    async def run_once(self) -> int:
+        """Перенести всё, что подходит под порог сейчас. Сколько перенесено."""
+        cutoff = archive_cutoff()
+        total = 0
+        while True:
+            # Короткая транзакция на пачку: горячая таблица не блокируется надолго
+            async with self.session_factory() as session:
+                moved = await archive_batch(session, cutoff, self.batch_size)
+                await session.commit()
+            total += moved
+            self.archived += moved
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+
+        self.runs += 1
+        self.last_run = datetime.utcnow()
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                moved = await self.run_once()
+                if moved:
+                    log.info("archived %d events", moved)
+            except Exception:
+                self.failed += 1
+                log.exception("event archiving failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "cutoff": archive_cutoff(),
+            "runs": self.runs,
+            "archived": self.archived,
+            "failed": self.failed,
+            "last_run": self.last_run,
+        }
+
+
+event_archiver = EventArchiver(
+    SessionLocal,
+    settings.archive_interval,
+    settings.archive_batch_size,
+    settings.archive_pause,
+)
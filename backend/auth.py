@@ -1,20 +1,53 @@
 import uuid
-from typing import AsyncGenerator
-from security import pwd_context
+from typing import AsyncGenerator, Optional
+from security import password_helper
 
+import jwt
 from fastapi import Depends, Request
-from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy,
 )
+from fastapi_users.jwt import decode_jwt
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from cache import LRUCache
 from config import settings
 from db import get_session
 from models import User
+from schemas import UserCreate, UserUpdate
+
+
+# =========================
+# User cache
+# =========================
+
+# user_id -> значения колонок User
+user_cache = LRUCache(settings.user_cache_size, ttl=settings.user_cache_ttl)
+
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+def _snapshot(user: User) -> dict:
+    return {key: getattr(user, key) for key in _USER_COLUMNS}
+
+
+def _restore(values: dict) -> User:
+    # Каждому запросу — своя detached-копия: один ORM-объект
+    # не должен попадать в несколько сессий одновременно
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def forget_user(user_id: uuid.UUID) -> None:
+    user_cache.pop(user_id)
 
 
 # =========================
@@ -32,16 +65,80 @@ async def get_user_db(
 # =========================
 
 class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
-    password_helper = pwd_context
+    """
+    Хэширование паролей вынесено из event loop в пул password_helper.
+    """
+
     reset_password_token_secret = settings.jwt_secret
     verification_token_secret = settings.jwt_secret
 
+    async def authenticate(
+        self, credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Хэшируем впустую против timing-атаки, как fastapi-users
+            await self.password_helper.hash_async(credentials.password)
+            return None
+
+        verified, updated_hash = await self.password_helper.verify_and_update_async(
+            credentials.password, user.hashed_password
+        )
+        if not verified:
+            return None
+        # Хэш со старой схемой или параметрами — обновляем
+        if updated_hash is not None:
+            await self.user_db.update(user, {"hashed_password": updated_hash})
+            forget_user(user.id)
+
+        return user
+
+    async def create(
+        self,
+        user_create: UserCreate,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> User:
+        async with self.password_helper.prehashed(user_create.password):
+            return await super().create(user_create, safe, request)
+
+    async def update(
+        self,
+        user_update: UserUpdate,
+        user: User,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> User:
+        async with self.password_helper.prehashed(user_update.password):
+            return await super().update(user_update, user, safe, request)
+
+    async def reset_password(
+        self, token: str, password: str, request: Optional[Request] = None
+    ) -> User:
+        async with self.password_helper.prehashed(password):
+            return await super().reset_password(token, password, request)
+
+    async def on_after_update(
+        self, user: User, update_dict: dict, request: Optional[Request] = None
+    ) -> None:
+        forget_user(user.id)
+
+    async def on_after_reset_password(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        forget_user(user.id)
+
+    async def on_after_delete(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        forget_user(user.id)
 
 
 async def get_user_manager(
     user_db: SQLAlchemyUserDatabase = Depends(get_user_db),
 ) -> AsyncGenerator[UserManager, None]:
-    yield UserManager(user_db)
+    yield UserManager(user_db, password_helper)
 
 
 # =========================
@@ -51,7 +148,47 @@ async def get_user_manager(
 bearer_transport = BearerTransport(tokenUrl="/auth/login")
 
 
+class CachedJWTStrategy(JWTStrategy):
+    """
+    JWTStrategy, которая берёт пользователя из user_cache,
+    а в БД идёт только при промахе.
+    """
+
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager
+    ) -> Optional[User]:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+            user_id = user_manager.parse_id(data.get("sub"))
+        except (jwt.PyJWTError, exceptions.InvalidID):
+            return None
+
+        values = user_cache.get(user_id)
+        if values is not None:
+            return _restore(values)
+
+        try:
+            user = await user_manager.get(user_id)
+        except exceptions.UserNotExists:
+            return None
+
+        user_cache.set(user_id, _snapshot(user))
+        return user
+
+
 def get_jwt_strategy() -> JWTStrategy:
+    return CachedJWTStrategy(
+        secret=settings.jwt_secret,
+        lifetime_seconds=60 * 60 * 24 * 7,
+    )
+
+
+def get_uncached_jwt_strategy() -> JWTStrategy:
     return JWTStrategy(
         secret=settings.jwt_secret,
         lifetime_seconds=60 * 60 * 24 * 7,
@@ -64,6 +201,13 @@ auth_backend = AuthenticationBackend(
     get_strategy=get_jwt_strategy,
 )
 
+# Те же токены, но пользователь всегда читается из БД
+uncached_auth_backend = AuthenticationBackend(
+    name="jwt-uncached",
+    transport=bearer_transport,
+    get_strategy=get_uncached_jwt_strategy,
+)
+
 
 # =========================
 # FastAPI Users
@@ -75,3 +219,15 @@ fastapi_users = FastAPIUsers(
 )
 
 current_user = fastapi_users.current_user()
+
+# Для чувствительных к безопасности маршрутов (смена пароля/почты,
+# администрирование): без кэша, деактивация видна сразу
+fastapi_users_uncached = FastAPIUsers(
+    get_user_manager,
+    [uncached_auth_backend],
+)
+
+current_user_uncached = fastapi_users_uncached.current_user()
+current_superuser = fastapi_users_uncached.current_user(
+    active=True, superuser=True
+)
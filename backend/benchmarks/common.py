@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+
+def use_sqlite(name: str) -> str:
+    """
+    Направляет приложение на свежую SQLite-базу во временном каталоге.
+    Вызывать до импорта config/db/main.
+    """
+    path = os.path.join(tempfile.gettempdir(), f"petify_{name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    return path
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Латентности в секундах -> сводка в миллисекундах."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples, default=0) * 1000, 2),
+    }
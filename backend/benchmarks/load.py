@@ -0,0 +1,386 @@
+"""
+Нагрузочный прогон всех роутеров через ASGI-клиент на синтетических данных.
+
+    cd backend
+    python -m benchmarks.load --duration 20 --concurrency 32 --out baseline.json
+    python -m benchmarks.load --duration 20 --concurrency 32 --compare baseline.json
+
+По умолчанию — свежая SQLite-база. BENCH_DATABASE_URL направляет прогон
+в другую (пустую) базу, например локальный MySQL.
+Код возврата 1, если --compare нашёл регрессии.
+С QUERY_BUDGET_MODE=raise прогон падает на превышении @query_budget и N+1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from benchmarks.common import summarize, use_sqlite
+
+if os.environ.get("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    use_sqlite("load")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import main  # noqa: E402
+from db import SessionLocal, engine  # noqa: E402
+from models import (  # noqa: E402
+    Clinic,
+    Event,
+    Habit,
+    HealthRecord,
+    Pet,
+    Preference,
+    User,
+)
+from security import password_helper  # noqa: E402
+
+PASSWORD = "LoadPassword1"
+CENTER = (53.2, 50.15)
+
+# Алфавит для имён и заметок: кириллица, как в реальных данных
+WORDS = (
+    "корм прогулка вакцина осмотр игрушка сон мяч рыба когтеточка "
+    "лоток поводок витамины зубы шерсть прививка клиника"
+).split()
+
+
+# =========================
+# Synthetic dataset
+# =========================
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def seed(args, rng: random.Random) -> list[dict]:
+    """
+    Пользователи, питомцы и их данные пачками через executemany.
+    Возвращает [{email, pet_ids, event_ids, habit_ids, record_ids}].
+    """
+    hashed = await password_helper.hash_async(PASSWORD)
+    now = datetime.utcnow()
+    users, rows = [], defaultdict(list)
+
+    for u in range(args.users):
+        user_id = uuid.uuid4()
+        email = f"load{u}@petify.dev"
+        rows[User].append(
+            {
+                "id": user_id,
+                "email": email,
+                "hashed_password": hashed,
+                "is_active": True,
+                "is_superuser": False,
+                "is_verified": True,
+            }
+        )
+        user = {"email": email, "pet_ids": [], "event_ids": [], "habit_ids": [], "record_ids": []}
+
+        for p in range(args.pets):
+            pet_id = str(uuid.uuid4())
+            user["pet_ids"].append(pet_id)
+            rows[Pet].append(
+                {
+                    "id": pet_id,
+                    "user_id": user_id,
+                    "name": f"Питомец {u}-{p}",
+                    "species": rng.choice(["Кот", "Собака"]),
+                    "notes": _text(rng, 6),
+                    "created_at": now - timedelta(minutes=p),
+                }
+            )
+            rows[Preference].append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "pet_id": pet_id,
+                    "likes": _text(rng, 3),
+                    "dislikes": _text(rng, 2),
+                }
+            )
+            for _ in range(args.habits):
+                habit_id = str(uuid.uuid4())
+                user["habit_ids"].append(habit_id)
+                rows[Habit].append(
+                    {
+                        "id": habit_id,
+                        "pet_id": pet_id,
+                        "title": _text(rng, 2),
+                        "description": _text(rng, 8),
+                        "created_at": now,
+                    }
+                )
+            for _ in range(args.records):
+                record_id = str(uuid.uuid4())
+                user["record_ids"].append(record_id)
+                rows[HealthRecord].append(
+                    {
+                        "id": record_id,
+                        "pet_id": pet_id,
+                        "record_type": rng.choice(["vaccination", "checkup"]),
+                        "title": _text(rng, 2),
+                        "details": _text(rng, 10),
+                        "record_date": (now - timedelta(days=rng.randint(0, 700))).date().isoformat(),
+                        "created_at": now,
+                    }
+                )
+            for e in range(args.events):
+                event_id = str(uuid.uuid4())
+                user["event_ids"].append(event_id)
+                start_at = now + timedelta(minutes=rng.randint(-60 * 24 * 60, 60 * 24 * 60))
+                recurring = e < args.events * args.recurring_share
+                rows[Event].append(
+                    {
+                        "id": event_id,
+                        "pet_id": pet_id,
+                        "type": rng.choice(["feeding", "walk", "vet_visit"]),
+                        "title": _text(rng, 2),
+                        "notes": _text(rng, 5),
+                        "start_at": start_at,
+                        "status": rng.choice(["planned", "planned", "done", "cancelled"]),
+                        "recurrence": {"freq": "daily", "interval": 1, "until": None, "count": 60, "exdates": []}
+                        if recurring
+                        else None,
+                        "series_until": start_at + timedelta(days=59) if recurring else None,
+                        "created_at": now,
+                    }
+                )
+        users.append(user)
+
+    for _ in range(args.clinics):
+        rows[Clinic].append(
+            {
+                "id": str(uuid.uuid4()),
+                "name": f"Клиника {_text(rng, 1)}",
+                "address": _text(rng, 3),
+                "lat": CENTER[0] + rng.uniform(-0.5, 0.5),
+                "lng": CENTER[1] + rng.uniform(-0.8, 0.8),
+            }
+        )
+
+    async with SessionLocal() as session:
+        for model in (User, Pet, Preference, Habit, HealthRecord, Event, Clinic):
+            for start in range(0, len(rows[model]), 5000):
+                await session.execute(insert(model), rows[model][start:start + 5000])
+        await session.commit()
+
+    return users
+
+
+# =========================
+# Scenarios
+# =========================
+# Каждый сценарий: (имя, вес, функция(rng, user) -> (method, url, kwargs)).
+# Имя — шаблон маршрута, по нему агрегируются латентности.
+
+def _window(rng):
+    start = datetime.utcnow() + timedelta(days=rng.randint(-30, 30))
+    return {"from": start.isoformat(), "to": (start + timedelta(days=7)).isoformat()}
+
+
+def _event_body(rng, user):
+    return {
+        "pet_id": rng.choice(user["pet_ids"]),
+        "type": "walk",
+        "title": _text(rng, 2),
+        "start_at": (datetime.utcnow() + timedelta(hours=rng.randint(1, 500))).isoformat(),
+    }
+
+
+SCENARIOS = [
+    ("GET /pets", 10, lambda rng, u: ("GET", "/pets", {})),
+    ("GET /pets/overview", 3, lambda rng, u: ("GET", "/pets/overview", {})),
+    ("GET /pets/{id}", 6, lambda rng, u: ("GET", f"/pets/{rng.choice(u['pet_ids'])}", {})),
+    ("GET /pets/{id}/overview", 4, lambda rng, u: ("GET", f"/pets/{rng.choice(u['pet_ids'])}/overview", {})),
+    ("PUT /pets/{id}", 1, lambda rng, u: ("PUT", f"/pets/{rng.choice(u['pet_ids'])}", {"json": {"notes": _text(rng, 6)}})),
+    ("GET /pets/{id}/preferences", 4, lambda rng, u: ("GET", f"/pets/{rng.choice(u['pet_ids'])}/preferences", {})),
+    ("PUT /pets/{id}/preferences", 1, lambda rng, u: ("PUT", f"/pets/{rng.choice(u['pet_ids'])}/preferences", {"json": {"likes": _text(rng, 3)}})),
+    ("GET /pets/{id}/habits", 5, lambda rng, u: ("GET", f"/pets/{rng.choice(u['pet_ids'])}/habits", {})),
+    ("POST /pets/{id}/habits", 1, lambda rng, u: ("POST", f"/pets/{rng.choice(u['pet_ids'])}/habits", {"json": {"title": _text(rng, 2)}})),
+    ("GET /pets/{id}/health-records", 5, lambda rng, u: ("GET", f"/pets/{rng.choice(u['pet_ids'])}/health-records", {})),
+    ("PUT /health-records/{id}", 1, lambda rng, u: ("PUT", f"/health-records/{rng.choice(u['record_ids'])}", {"json": {"details": _text(rng, 10)}})),
+    ("GET /events", 12, lambda rng, u: ("GET", "/events", {"params": _window(rng)})),
+    ("GET /events?pet_id", 6, lambda rng, u: ("GET", "/events", {"params": {**_window(rng), "pet_id": rng.choice(u["pet_ids"])}})),
+    ("GET /events/{id}", 5, lambda rng, u: ("GET", f"/events/{rng.choice(u['event_ids'])}", {})),
+    ("POST /events", 3, lambda rng, u: ("POST", "/events", {"json": _event_body(rng, u)})),
+    ("PUT /events/{id}", 2, lambda rng, u: ("PUT", f"/events/{rng.choice(u['event_ids'])}", {"json": {"notes": _text(rng, 5)}})),
+    ("GET /clinics/search", 8, lambda rng, u: ("GET", "/clinics/search", {"params": {
+        "lat": CENTER[0] + rng.uniform(-0.3, 0.3),
+        "lng": CENTER[1] + rng.uniform(-0.5, 0.5),
+        "radius": rng.choice([1000, 3000, 10000]),
+    }})),
+    ("GET /users/me", 3, lambda rng, u: ("GET", "/users/me", {})),
+    ("POST /auth/login", 1, lambda rng, u: ("POST", "/auth/login", {"data": {"username": u["email"], "password": PASSWORD}})),
+]
+
+
+# =========================
+# Driver
+# =========================
+
+async def login(client: httpx.AsyncClient, user: dict) -> None:
+    response = await client.post(
+        "/auth/login", data={"username": user["email"], "password": PASSWORD}
+    )
+    response.raise_for_status()
+    user["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def worker(client, users, rng, deadline, samples, errors) -> None:
+    names = [name for name, _, _ in SCENARIOS]
+    weights = [weight for _, weight, _ in SCENARIOS]
+    builders = {name: build for name, _, build in SCENARIOS}
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        user = rng.choice(users)
+        method, url, kwargs = builders[name](rng, user)
+
+        started = time.perf_counter()
+        response = await client.request(method, url, headers=user["headers"], **kwargs)
+        samples[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors[name] += 1
+
+
+async def drive(client, users, args, duration: float, seed: int) -> tuple[dict, dict, float]:
+    samples, errors = defaultdict(list), defaultdict(int)
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(
+            worker(client, users, random.Random(seed + i), deadline, samples, errors)
+            for i in range(args.concurrency)
+        )
+    )
+    return samples, errors, time.perf_counter() - started
+
+
+def report(samples: dict, errors: dict, elapsed: float, meta: dict) -> dict:
+    endpoints = {}
+    for name in sorted(samples):
+        endpoints[name] = {
+            **summarize(samples[name]),
+            "errors": errors.get(name, 0),
+            "rps": round(len(samples[name]) / elapsed, 1),
+        }
+
+    everything = [value for values in samples.values() for value in values]
+    return {
+        "meta": meta,
+        "total": {
+            **summarize(everything),
+            "errors": sum(errors.values()),
+            "rps": round(len(everything) / elapsed, 1),
+        },
+        "endpoints": endpoints,
+    }
+
+
+# =========================
+# Baseline comparison
+# =========================
+
+def compare(
+    current: dict, baseline: dict, tolerance: float, floor_ms: float, min_count: int
+) -> list[str]:
+    """
+    Регрессия: p50/p95/p99 выросли больше чем на tolerance (и не меньше
+    чем на floor_ms — шум), пропускная способность упала больше чем на
+    tolerance, или появились ошибки. Перцентили по эндпоинтам, где меньше
+    min_count замеров, не сравниваются.
+    """
+    problems = []
+    rows = {"total": (current["total"], baseline["total"])}
+    for name, stats in current["endpoints"].items():
+        if name in baseline["endpoints"]:
+            rows[name] = (stats, baseline["endpoints"][name])
+
+    for name, (now, before) in rows.items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if min(now["count"], before["count"]) < min_count:
+                break
+            if now[key] > before[key] * (1 + tolerance) and now[key] - before[key] >= floor_ms:
+                problems.append(f"{name}: {key} {before[key]} -> {now[key]}")
+        if now["rps"] < before["rps"] * (1 - tolerance):
+            problems.append(f"{name}: rps {before['rps']} -> {now['rps']}")
+        if now["errors"] > before["errors"]:
+            problems.append(f"{name}: errors {before['errors']} -> {now['errors']}")
+    return problems
+
+
+async def main_async(args) -> int:
+    rng = random.Random(args.seed)
+
+    await main.app.router.startup()
+    seed_started = time.perf_counter()
+    users = await seed(args, rng)
+    seed_elapsed = time.perf_counter() - seed_started
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        for user in users:
+            await login(client, user)
+
+        if args.warmup > 0:
+            await drive(client, users, args, args.warmup, args.seed + 10_000)
+        samples, errors, elapsed = await drive(client, users, args, args.duration, args.seed)
+
+    await main.app.router.shutdown()
+    await engine.dispose()
+
+    meta = {
+        "database": engine.dialect.name,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "seed_seconds": round(seed_elapsed, 2),
+        **{key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+    }
+    result = report(samples, errors, elapsed, meta)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        problems = compare(result, baseline, args.tolerance, args.floor_ms, args.min_count)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--pets", type=int, default=3, help="на пользователя")
+    parser.add_argument("--events", type=int, default=200, help="на питомца")
+    parser.add_argument("--recurring-share", type=float, default=0.1)
+    parser.add_argument("--habits", type=int, default=5, help="на питомца")
+    parser.add_argument("--records", type=int, default=10, help="на питомца")
+    parser.add_argument("--clinics", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="секунды замера")
+    parser.add_argument("--warmup", type=float, default=3.0, help="секунды без замера")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="сохранить результат как baseline")
+    parser.add_argument("--compare", help="сравнить с сохранённым baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--floor-ms", type=float, default=2.0)
+    parser.add_argument("--min-count", type=int, default=50)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
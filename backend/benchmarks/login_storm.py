@@ -0,0 +1,101 @@
+"""
+Латентность несвязанного эндпоинта (GET /) во время шквала логинов:
+хэширование в event loop против пула password_helper.
+
+    cd backend
+    python -m benchmarks.login_storm --logins 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import summarize, use_sqlite
+
+use_sqlite("login_storm")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from security import password_helper  # noqa: E402
+
+EMAIL = "storm@petify.dev"
+PASSWORD = "StormPassword1"
+
+
+async def _probe(
+    client: httpx.AsyncClient, stop: asyncio.Event, interval: float = 0.01
+) -> list[float]:
+    """
+    Запросы по расписанию раз в interval. Латентность считается от
+    запланированного момента отправки, иначе заблокированный event loop
+    просто «съедает» пробы (coordinated omission).
+    """
+    samples = []
+    started = time.perf_counter()
+    tick = 0
+    while not stop.is_set():
+        scheduled = started + tick * interval
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get("/")
+        samples.append(time.perf_counter() - scheduled)
+        tick = max(tick + 1, int((time.perf_counter() - started) / interval))
+    return samples
+
+
+async def _storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with slots:
+            response = await client.post(
+                "/auth/login", data={"username": EMAIL, "password": PASSWORD}
+            )
+            response.raise_for_status()
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def _run(client: httpx.AsyncClient, logins: int, concurrency: int) -> dict:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(client, stop))
+
+    started = time.perf_counter()
+    await _storm(client, logins, concurrency)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    return {
+        "logins_per_sec": round(logins / elapsed, 1),
+        "probe": summarize(await probe),
+    }
+
+
+async def main_async(args) -> None:
+    await main.app.router.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        response = await client.post(
+            "/auth/register", json={"email": EMAIL, "password": PASSWORD}
+        )
+        response.raise_for_status()
+
+        pool = password_helper.executor
+        results = {}
+
+        password_helper.executor = None
+        results["event_loop"] = await _run(client, args.logins, args.concurrency)
+
+        password_helper.executor = pool
+        results["thread_pool"] = await _run(client, args.logins, args.concurrency)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,242 @@
+"""
+Удаление питомца с большой историей: время и пик памяти Python.
+
+    cd backend
+    python -m benchmarks.pet_delete --events 100000
+    python -m benchmarks.pet_delete --events 20000 --modes orm,sync,background
+
+Режимы (каждый на свежем питомце):
+  orm        — прежний путь: история грузится в сессию, session.delete(pet)
+  sync       — DELETE /pets/{id}: set-based DELETE по дочерним таблицам
+  background — DELETE /pets/{id}?background=true: события пачками в фоне;
+               во время удаления замеряется GET /pets того же пользователя
+
+Память — пик tracemalloc за время удаления (времена с ним чуть выше).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import summarize, use_sqlite
+
+if os.environ.get("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    use_sqlite("pet_delete")
+# Порог фона не мешает режиму sync
+os.environ.setdefault("PET_DELETE_BACKGROUND_THRESHOLD", str(10**9))
+os.environ.setdefault("REMINDERS_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+import main  # noqa: E402
+from db import SessionLocal, engine  # noqa: E402
+from models import (  # noqa: E402
+    Event,
+    EventOverride,
+    Habit,
+    HealthRecord,
+    Pet,
+    Preference,
+    User,
+)
+from pet_deletion import pet_deleter  # noqa: E402
+from security import password_helper  # noqa: E402
+
+PASSWORD = "DeletePassword1"
+EMAIL = "delete@petify.dev"
+CHUNK = 10_000
+
+
+async def seed_user() -> None:
+    async with SessionLocal() as session:
+        await session.execute(
+            insert(User),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "email": EMAIL,
+                    "hashed_password": await password_helper.hash_async(PASSWORD),
+                    "is_active": True,
+                    "is_superuser": False,
+                    "is_verified": True,
+                }
+            ],
+        )
+        await session.commit()
+
+
+async def seed_pet(args) -> str:
+    """Питомец с args.events событиями; 1% — серии с двумя исключениями."""
+    pet_id = str(uuid.uuid4())
+    start = datetime(2020, 1, 1, 8)
+    now = datetime.utcnow()
+
+    async with SessionLocal() as session:
+        user_id = await session.scalar(select(User.id).where(User.email == EMAIL))
+        await session.execute(
+            insert(Pet),
+            [{"id": pet_id, "user_id": user_id, "name": "Долгожитель", "species": "Кот"}],
+        )
+        await session.execute(
+            insert(Preference),
+            [{"id": str(uuid.uuid4()), "pet_id": pet_id, "likes": "рыба"}],
+        )
+        await session.execute(
+            insert(Habit),
+            [
+                {"id": str(uuid.uuid4()), "pet_id": pet_id, "title": f"Привычка {i}"}
+                for i in range(args.habits)
+            ],
+        )
+        await session.execute(
+            insert(HealthRecord),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "pet_id": pet_id,
+                    "record_type": "checkup",
+                    "title": f"Осмотр {i}",
+                    "created_at": now,
+                }
+                for i in range(args.records)
+            ],
+        )
+
+        for offset in range(0, args.events, CHUNK):
+            events, overrides = [], []
+            for i in range(offset, min(offset + CHUNK, args.events)):
+                event_id = str(uuid.uuid4())
+                at = start + timedelta(hours=i)
+                recurring = i % 100 == 0
+                events.append(
+                    {
+                        "id": event_id,
+                        "pet_id": pet_id,
+                        "type": "feeding",
+                        "title": f"Кормление {i}",
+                        "start_at": at,
+                        "status": "done",
+                        "recurrence": {"freq": "daily", "interval": 1} if recurring else None,
+                        "created_at": now,
+                    }
+                )
+                if recurring:
+                    overrides += [
+                        {
+                            "id": str(uuid.uuid4()),
+                            "event_id": event_id,
+                            "occurrence_at": at + timedelta(days=day),
+                            "status": "cancelled",
+                        }
+                        for day in (1, 2)
+                    ]
+            await session.execute(insert(Event), events)
+            await session.execute(insert(EventOverride), overrides)
+            await session.commit()
+    return pet_id
+
+
+async def remaining(pet_id: str) -> int:
+    async with SessionLocal() as session:
+        return await session.scalar(
+            select(func.count()).select_from(Event).where(Event.pet_id == pet_id)
+        )
+
+
+async def delete_orm(client, headers, pet_id: str) -> dict:
+    async with SessionLocal() as session:
+        pet = await session.scalar(
+            select(Pet)
+            .where(Pet.id == pet_id)
+            .options(
+                selectinload(Pet.preferences),
+                selectinload(Pet.habits),
+                selectinload(Pet.health_records),
+                selectinload(Pet.due_dates),
+                selectinload(Pet.events).selectinload(Event.overrides),
+            )
+        )
+        await session.delete(pet)
+        await session.commit()
+    return {}
+
+
+async def delete_sync(client, headers, pet_id: str) -> dict:
+    response = await client.delete(f"/pets/{pet_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return {}
+
+
+async def delete_background(client, headers, pet_id: str) -> dict:
+    response = await client.delete(
+        f"/pets/{pet_id}", params={"background": "true"}, headers=headers
+    )
+    assert response.status_code == 202, response.text
+
+    # Пока идёт удаление, обычные запросы пользователя должны проходить
+    samples = []
+    while pet_deleter.deleting(pet_id):
+        started = time.perf_counter()
+        probe = await client.get("/pets", headers=headers)
+        samples.append(time.perf_counter() - started)
+        assert probe.status_code == 200, probe.text
+        await asyncio.sleep(0.01)
+    return {"reads_during_delete": summarize(samples)}
+
+
+MODES = {"orm": delete_orm, "sync": delete_sync, "background": delete_background}
+
+
+async def main_async(args) -> None:
+    await main.app.router.startup()
+    await seed_user()
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        response = await client.post(
+            "/auth/login", data={"username": EMAIL, "password": PASSWORD}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for mode in args.modes.split(","):
+            pet_id = await seed_pet(args)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            extra = await MODES[mode](client, headers, pet_id)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            assert await remaining(pet_id) == 0, f"{mode}: events left"
+            results[mode] = {
+                "seconds": round(elapsed, 3),
+                "peak_mb": round(peak / 2**20, 2),
+                **extra,
+            }
+
+    await main.app.router.shutdown()
+    await engine.dispose()
+
+    meta = {"database": engine.dialect.name, **vars(args)}
+    print(json.dumps({"meta": meta, "results": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--habits", type=int, default=20)
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--modes", default="sync,background", help="orm,sync,background")
+    asyncio.run(main_async(parser.parse_args()))
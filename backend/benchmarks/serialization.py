@@ -0,0 +1,101 @@
+"""
+Сериализация 10k EventRead: стандартный путь FastAPI
+(response_model + JSONResponse) против fast_json.
+
+    cd backend
+    python -m benchmarks.serialization --rows 10000 --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import summarize, use_sqlite
+
+use_sqlite("serialization")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from models import Event  # noqa: E402
+from responses import fast_json  # noqa: E402
+from schemas import EventRead  # noqa: E402
+
+
+def make_events(count: int) -> list[Event]:
+    pet_id = str(uuid.uuid4())
+    start = datetime(2026, 1, 1, 8)
+    return [
+        Event(
+            id=str(uuid.uuid4()),
+            pet_id=pet_id,
+            type="feeding",
+            title=f"Кормление {i}",
+            start_at=start + timedelta(hours=i),
+            end_at=start + timedelta(hours=i, minutes=15),
+            location=None,
+            notes="Влажный корм, 85 г",
+            status="planned",
+            recurrence=None,
+            created_at=start,
+        )
+        for i in range(count)
+    ]
+
+
+def build_app(events: list[Event]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(
+        "/default",
+        response_model=list[EventRead],
+        response_class=JSONResponse,
+    )
+    async def default():
+        return events
+
+    @app.get("/fast", response_model=list[EventRead])
+    async def fast():
+        return fast_json(list[EventRead], events)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, url: str, repeat: int) -> dict:
+    samples = []
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(url)
+        samples.append(time.perf_counter() - started)
+        body = response.json()
+    return {"bytes": len(response.content), "rows": len(body), **summarize(samples)}
+
+
+async def main_async(args) -> None:
+    app = build_app(make_events(args.rows))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        default = await client.get("/default")
+        fast = await client.get("/fast")
+        assert default.json() == fast.json(), "fast_json output differs"
+
+        results = {
+            "default": await measure(client, "/default", args.repeat),
+            "fast_json": await measure(client, "/fast", args.repeat),
+        }
+
+    results["speedup_p50"] = round(
+        results["default"]["p50_ms"] / results["fast_json"]["p50_ms"], 2
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(main_async(parser.parse_args()))
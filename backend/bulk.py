@@ -0,0 +1,69 @@
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import Base
+from schemas import BulkCreateResult, BulkItemError
+
+S = TypeVar("S", bound=BaseModel)
+
+
+def validate_items(
+    schema: type[S], items: list[dict]
+) -> tuple[list[tuple[int, S]], list[BulkItemError]]:
+    """Валидация каждого элемента отдельно: ошибки привязаны к индексу."""
+    valid = []
+    errors = []
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as exc:
+            errors.append(
+                BulkItemError(
+                    index=index,
+                    detail="; ".join(
+                        f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                        for err in exc.errors()
+                    ),
+                )
+            )
+    return valid, errors
+
+
+async def insert_rows(
+    session: AsyncSession,
+    model: type[Base],
+    rows: list[dict],
+    errors: list[BulkItemError],
+    atomic: bool,
+    after_insert: Callable[[list[dict]], Awaitable[None]] | None = None,
+) -> BulkCreateResult:
+    """
+    Вставка одним executemany в одной транзакции.
+
+    atomic=True — при любой ошибке ничего не вставляется (422);
+    atomic=False — вставляются валидные строки, ошибки возвращаются.
+    after_insert(rows) выполняется в той же транзакции до commit.
+    """
+    errors.sort(key=lambda error: error.index)
+    if atomic and errors:
+        raise HTTPException(
+            status_code=422,
+            detail=[error.model_dump() for error in errors],
+        )
+
+    for row in rows:
+        row["id"] = str(uuid.uuid4())
+
+    if rows:
+        await session.execute(insert(model), rows)
+        if after_insert is not None:
+            await after_insert(rows)
+        await session.commit()
+
+    return BulkCreateResult(created=[row["id"] for row in rows], errors=errors)
@@ -0,0 +1,254 @@
+"""
+Поток изменений данных пользователя (GET /events/stream).
+
+Ручки публикуют изменение после commit:
+
+    await change_bus.publish(user.id, "event", "created", event.id, event.pet_id)
+
+Шина раздаёт его подпискам этого пользователя в текущем воркере,
+транспорт — остальным воркерам. Очередь подписки ограничена: если клиент
+не успевает читать, вместо накопленных изменений он получает одно
+resync — «перечитай данные». Подписка без изменений не делает запросов к БД.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
+
+import orjson
+
+from access import forget_pet
+from config import settings
+from redis_client import CONNECTION_ERRORS, RedisClient, RedisError
+
+log = logging.getLogger("petify.changes")
+
+# created / updated / completed / deleted; resync — только в потоке
+RESYNC = "resync"
+
+
+@dataclass(frozen=True)
+class Change:
+    user_id: str
+    entity: str  # pet / preference / habit / health_record / event
+    action: str
+    id: str | None
+    pet_id: str | None
+
+
+class Subscription:
+    def __init__(self, user_id: str, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[Change] = asyncio.Queue(maxsize)
+        self.overflows = 0
+
+    def offer(self, change: Change) -> None:
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # Клиент отстал: отдельные изменения уже не помогут
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(Change(self.user_id, "*", RESYNC, None, None))
+            self.overflows += 1
+
+
+# =========================
+# Transports
+# =========================
+
+class LocalTransport:
+    """Один воркер: изменения не покидают процесс."""
+
+    dropped = 0
+
+    async def publish(self, change: Change) -> None:
+        pass
+
+    def start(self, bus: "ChangeBus") -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisTransport:
+    """
+    PUBLISH / SUBSCRIBE в Redis-совместимом сервере. Свои сообщения
+    воркер узнаёт по origin и не раздаёт повторно.
+
+    publish только кладёт изменение в ограниченную очередь, PUBLISH
+    делает фоновая задача: медленный или недоступный Redis не задерживает
+    ответы на запись. Если очередь полна, изменение отбрасывается.
+    """
+
+    CHANNEL = "petify:changes"
+
+    def __init__(self, url: str, timeout: float, outbox_size: int):
+        self.client = RedisClient(url, timeout)
+        self.origin = uuid.uuid4().hex
+        self._outbox: asyncio.Queue[Change] = asyncio.Queue(outbox_size)
+        self._task: asyncio.Task | None = None
+        self._sender: asyncio.Task | None = None
+        self.dropped = 0
+
+    async def publish(self, change: Change) -> None:
+        try:
+            self._outbox.put_nowait(change)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning("change outbox full, change not sent to other workers")
+
+    async def _send(self) -> None:
+        while True:
+            change = await self._outbox.get()
+            message = orjson.dumps({"origin": self.origin, **asdict(change)})
+            try:
+                await self.client.command("PUBLISH", self.CHANNEL, message)
+            except (*CONNECTION_ERRORS, RedisError) as exc:
+                log.warning("change not published to other workers: %s", exc)
+
+    async def _listen(self, bus: "ChangeBus") -> None:
+        while True:
+            try:
+                async for data in self.client.subscribe(self.CHANNEL):
+                    message = orjson.loads(data)
+                    if message.pop("origin") != self.origin:
+                        bus.dispatch(Change(**message))
+            except (*CONNECTION_ERRORS, RedisError) as exc:
+                log.warning("change subscription lost: %s", exc)
+            # Пока подписки не было, изменения могли потеряться
+            bus.resync_all()
+            await asyncio.sleep(1.0)
+
+    def start(self, bus: "ChangeBus") -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(bus))
+            self._sender = asyncio.create_task(self._send())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._sender):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._sender = None
+        await self.client.close()
+
+
+# =========================
+# Bus
+# =========================
+
+class ChangeBus:
+    def __init__(self, queue_size: int, transport: LocalTransport | RedisTransport):
+        self.queue_size = queue_size
+        self.transport = transport
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+        self.published = 0
+
+    def subscribe(self, user_id) -> Subscription:
+        subscription = Subscription(str(user_id), self.queue_size)
+        self._subscriptions[subscription.user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def dispatch(self, change: Change) -> None:
+        """Раздать изменение подпискам этого воркера."""
+        if change.entity == "pet" and change.action == "deleted":
+            # Удаление в другом воркере: владелец из кэша больше не верен
+            forget_pet(change.pet_id)
+        for subscription in self._subscriptions.get(change.user_id, ()):
+            subscription.offer(change)
+
+    def resync_all(self) -> None:
+        for user_id, subscriptions in self._subscriptions.items():
+            for subscription in subscriptions:
+                subscription.offer(Change(user_id, "*", RESYNC, None, None))
+
+    async def publish(
+        self,
+        user_id,
+        entity: str,
+        action: str,
+        entity_id: str | None,
+        pet_id: str | None = None,
+    ) -> None:
+        """Вызывать после commit."""
+        change = Change(str(user_id), entity, action, entity_id, pet_id)
+        self.published += 1
+        self.dispatch(change)
+        await self.transport.publish(change)
+
+    def start(self) -> None:
+        self.transport.start(self)
+
+    async def stop(self) -> None:
+        await self.transport.stop()
+
+    def stats(self) -> dict:
+        subscriptions = [sub for subs in self._subscriptions.values() for sub in subs]
+        return {
+            "transport": type(self.transport).__name__,
+            "users": len(self._subscriptions),
+            "subscriptions": len(subscriptions),
+            "published": self.published,
+            "dropped": self.transport.dropped,
+            "overflows": sum(sub.overflows for sub in subscriptions),
+        }
+
+
+change_bus = ChangeBus(
+    settings.change_stream_queue_size,
+    RedisTransport(
+        settings.change_stream_redis_url,
+        settings.redis_timeout,
+        settings.change_stream_outbox_size,
+    )
+    if settings.change_stream_redis_url
+    else LocalTransport(),
+)
+
+
+# =========================
+# Server-Sent Events
+# =========================
+
+def _frame(event: str, data: bytes, event_id: int | None = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + data + b"\n\n"
+
+
+async def sse_stream(user_id, heartbeat: float) -> AsyncIterator[bytes]:
+    """
+    Кадры text/event-stream для пользователя: change / resync и
+    комментарий-пинг раз в heartbeat секунд, чтобы прокси не рвали поток.
+    """
+    subscription = change_bus.subscribe(user_id)
+    try:
+        yield b"retry: 3000\n\n"
+        sequence = 0
+        while True:
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+
+            sequence += 1
+            payload = asdict(change)
+            del payload["user_id"]
+            event = RESYNC if change.action == RESYNC else "change"
+            yield _frame(event, orjson.dumps(payload), sequence)
+    finally:
+        change_bus.unsubscribe(subscription)
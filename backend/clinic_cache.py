@@ -0,0 +1,243 @@
+"""
+Кэш поиска клиник по гео-тайлам.
+
+Ключ — (поколение, корзина радиуса, тайл). В записи лежат все клиники
+круга, накрывающего тайл вместе с радиусом корзины, поэтому любой запрос
+из этого тайла с радиусом не больше корзины обслуживается из кэша:
+точный haversine-фильтр и limit применяются к закэшированным строкам.
+
+Любое изменение клиник (импорт, seed) вызывает invalidate(): поколение
+увеличивается, и старые записи больше не читаются. Поколение одно —
+в БД (cache_generations); воркер сверяется с ним не чаще раза
+в clinic_cache_check_interval секунд, поэтому импорт из CLI
+(python -m clinic_import) виден всем воркерам через несколько секунд.
+С CLINIC_CACHE_REDIS_URL записи тайлов хранятся ещё и в Redis
+(или совместимом сервере) и общие для всех воркеров uvicorn.
+"""
+import logging
+import math
+import time
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import LRUCache
+from config import settings
+from geo import clinic_rows_in_circle, haversine_m
+from models import CacheGeneration
+from redis_client import CONNECTION_ERRORS, RedisClient, RedisError
+
+log = logging.getLogger("petify.clinic_cache")
+
+# Радиусы запросов округляются вверх до корзины
+RADIUS_BUCKETS = (250, 500, 1000, 2000, 5000, 10_000, 20_000, 50_000, 100_000)
+
+# Сторона тайла относительно корзины: меньше — меньше лишних строк
+# в записи, но больше тайлов и промахов при панорамировании карты
+TILE_FRACTION = 0.5
+
+METERS_PER_DEGREE = math.radians(1) * 6_371_008.8
+
+
+def radius_bucket(radius_m: float) -> float:
+    for bucket in RADIUS_BUCKETS:
+        if radius_m <= bucket:
+            return bucket
+    return radius_m
+
+
+def tile_of(lat: float, lng: float, radius_m: float) -> tuple[float, int, int]:
+    """(корзина, строка, столбец) тайла в сетке градусов этой корзины."""
+    bucket = radius_bucket(radius_m)
+    step = bucket * TILE_FRACTION / METERS_PER_DEGREE
+    return bucket, math.floor(lat / step), math.floor(lng / step)
+
+
+def tile_circle(tile: tuple[float, int, int]) -> tuple[float, float, float]:
+    """
+    Круг (lat, lng, радиус), содержащий круги всех запросов тайла:
+    центр тайла, радиус — до дальнего угла плюс корзина.
+    """
+    bucket, row, col = tile
+    step = bucket * TILE_FRACTION / METERS_PER_DEGREE
+    lat0, lat1 = max(row * step, -90.0), min((row + 1) * step, 90.0)
+    lng0, lng1 = col * step, (col + 1) * step
+    lat, lng = (lat0 + lat1) / 2, (lng0 + lng1) / 2
+
+    reach = max(
+        haversine_m(lat, lng, corner_lat, corner_lng)
+        for corner_lat in (lat0, lat1)
+        for corner_lng in (lng0, lng1)
+    )
+    # Запас на округление: лишняя строка отсечётся точным фильтром
+    return lat, lng, reach + bucket + 1.0
+
+
+# =========================
+# Generation in the database
+# =========================
+
+GENERATION_NAME = "clinics"
+
+
+async def stored_generation(session: AsyncSession) -> int:
+    generation = await session.scalar(
+        select(CacheGeneration.generation).where(
+            CacheGeneration.name == GENERATION_NAME
+        )
+    )
+    return generation or 0
+
+
+async def bump_stored_generation(session: AsyncSession) -> int:
+    """Увеличивает поколение в БД и фиксирует транзакцию."""
+    values = {"name": GENERATION_NAME, "generation": 1}
+    if session.bind.dialect.name == "mysql":
+        stmt = mysql_insert(CacheGeneration).values(**values)
+        stmt = stmt.on_duplicate_key_update(generation=CacheGeneration.generation + 1)
+    else:
+        stmt = sqlite_insert(CacheGeneration).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheGeneration.name],
+            set_={"generation": CacheGeneration.generation + 1},
+        )
+    await session.execute(stmt)
+    await session.commit()
+    return await stored_generation(session)
+
+
+# =========================
+# Shared backend (Redis protocol)
+# =========================
+
+class RedisBackend:
+    """Записи тайлов в Redis-совместимом сервере; поколение — только в БД."""
+
+    PREFIX = "petify:clinics:"
+
+    def __init__(self, url: str):
+        self.client = RedisClient(url, settings.redis_timeout)
+
+    async def get_tile(self, key: str) -> list[tuple] | None:
+        data = await self.client.command("GET", self.PREFIX + key)
+        return None if data is None else [tuple(row) for row in orjson.loads(data)]
+
+    async def set_tile(self, key: str, rows: list[tuple], ttl: float) -> None:
+        await self.client.command(
+            "SET", self.PREFIX + key, orjson.dumps(rows), "EX", max(int(ttl), 1)
+        )
+
+
+# =========================
+# Cache
+# =========================
+
+class ClinicSearchCache:
+    """
+    Двухуровневый кэш тайлов: LRU в памяти процесса и необязательный
+    общий backend. Недоступный backend не ломает поиск — запрос идёт в БД.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        shared: RedisBackend | None = None,
+        check_interval: float = 5.0,
+    ):
+        self.local = LRUCache(maxsize, ttl)
+        self.ttl = ttl
+        self.shared = shared
+        self.check_interval = check_interval
+        self._generation = 0
+        self._checked_at: float | None = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(generation: int, tile: tuple[float, int, int]) -> str:
+        bucket, row, col = tile
+        # "db": поколение из cache_generations; ключи прежнего счётчика
+        # в Redis с ним не пересекаются
+        return f"db{generation}:{bucket:g}:{row}:{col}"
+
+    async def _shared_call(self, method, *args):
+        try:
+            return await method(*args)
+        except (*CONNECTION_ERRORS, RedisError) as exc:
+            self.errors += 1
+            log.warning("shared clinic cache unavailable: %s", exc)
+            return None
+
+    async def generation(self, session: AsyncSession) -> int:
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._generation = await stored_generation(session)
+            self._checked_at = now
+        return self._generation
+
+    async def rows(
+        self, session: AsyncSession, lat: float, lng: float, radius_m: float
+    ) -> list[tuple]:
+        """Строки клиник (geo.CLINIC_FIELDS), среди которых все клиники круга."""
+        tile = tile_of(lat, lng, radius_m)
+        # Поколение читается до БД: запись, посчитанная до invalidate(),
+        # ляжет под старым поколением и не будет прочитана
+        key = self._key(await self.generation(session), tile)
+
+        rows = self.local.get(key)
+        if rows is not None:
+            self.hits += 1
+            return rows
+
+        if self.shared is not None:
+            rows = await self._shared_call(self.shared.get_tile, key)
+            if rows is not None:
+                self.hits += 1
+                self.shared_hits += 1
+                self.local.set(key, rows)
+                return rows
+
+        self.misses += 1
+        rows = await clinic_rows_in_circle(session, *tile_circle(tile))
+        self.local.set(key, rows)
+        if self.shared is not None:
+            await self._shared_call(self.shared.set_tile, key, rows, self.ttl)
+        return rows
+
+    async def invalidate(self, session: AsyncSession) -> None:
+        """
+        Вызывать после commit любого изменения клиник. Поколение в БД
+        увеличивается в своей транзакции — его увидят и другие процессы.
+        """
+        self._generation = await bump_stored_generation(session)
+        self._checked_at = time.monotonic()
+        self.local.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            **self.local.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "shared": self.shared is not None,
+            "shared_hits": self.shared_hits,
+            "shared_errors": self.errors,
+            "generation": self._generation,
+        }
+
+
+clinic_cache = ClinicSearchCache(
+    settings.clinic_cache_size,
+    settings.clinic_cache_ttl,
+    RedisBackend(settings.clinic_cache_redis_url)
+    if settings.clinic_cache_redis_url
+    else None,
+    settings.clinic_cache_check_interval,
+)
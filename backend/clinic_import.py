@@ -0,0 +1,398 @@
+"""
+Потоковый импорт клиник из выгрузок OSM / Nominatim.
+
+    cd backend
+    python -m clinic_import extract.json.gz --source nominatim
+    python -m clinic_import clinics.csv --batch-size 2000
+
+Форматы: JSON-массив (Nominatim), Overpass JSON ("elements"),
+GeoJSON ("features"), JSON Lines (.jsonl / .ndjson), CSV; любой
+из них может быть сжат gzip. Файл читается кусками: память растёт
+только с числом уникальных клиник (ключи дедупликации), но не с размером
+выгрузки.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import time
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass
+from typing import TextIO
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from clinic_cache import clinic_cache
+from helpers import clinic_key
+from models import Clinic
+
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 1000
+
+FORMATS = ("json", "jsonl", "csv")
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return round(self.read / self.seconds, 1) if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "rows_per_sec": self.rows_per_sec}
+
+
+# =========================
+# Readers
+# =========================
+
+def detect_format(filename: str) -> str:
+    name = filename.lower().removesuffix(".gz")
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return "json"
+
+
+def open_text(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def _iter_array(stream: TextIO, buffer: str) -> Iterator[dict]:
+    """Элементы JSON-массива; buffer начинается сразу после '['."""
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = stream.read(CHUNK_SIZE), 0
+            if not buffer:
+                return
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Объект оборван на границе куска — дочитываем
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        yield item
+        pos = end
+        if pos > CHUNK_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_json(stream: TextIO) -> Iterator[dict]:
+    """
+    Массив верхнего уровня или массив "elements" / "features" в объекте.
+    """
+    buffer = stream.read(CHUNK_SIZE).lstrip()
+    if buffer.startswith("["):
+        yield from _iter_array(stream, buffer[1:])
+        return
+
+    # Ищем ключ массива, дочитывая файл по мере надобности
+    while True:
+        for key in ('"elements"', '"features"'):
+            start = buffer.find(key)
+            bracket = buffer.find("[", start) if start >= 0 else -1
+            if bracket >= 0:
+                yield from _iter_array(stream, buffer[bracket + 1:])
+                return
+
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            raise ValueError("No clinic array found in JSON")
+        # Хвост на случай, если ключ разрезан границей куска
+        buffer = buffer[-64:] + chunk
+
+
+def iter_jsonl(stream: TextIO) -> Iterator[dict]:
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(stream: TextIO) -> Iterator[dict]:
+    yield from csv.DictReader(stream)
+
+
+READERS = {"json": iter_json, "jsonl": iter_jsonl, "csv": iter_csv}
+
+
+# =========================
+# Normalization
+# =========================
+
+def _clean(value, limit: int) -> str | None:
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    return value[:limit] or None
+
+
+def _float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _coordinates(raw: dict) -> tuple[float | None, float | None]:
+    geometry = raw.get("geometry")
+    if isinstance(geometry, dict) and geometry.get("type") == "Point":
+        coordinates = geometry.get("coordinates")
+        # Битая точка — строка пропускается как невалидная, импорт идёт дальше
+        if not isinstance(coordinates, (list, tuple)) or len(coordinates) < 2:
+            return None, None
+        lng, lat = coordinates[:2]
+        return _float(lat), _float(lng)
+
+    # Overpass: у way / relation координаты в "center"
+    point = raw.get("center") if "lat" not in raw else raw
+    if not isinstance(point, dict):
+        return None, None
+    return _float(point.get("lat")), _float(point.get("lon", point.get("lng")))
+
+
+def _address(raw: dict, tags: dict, name: str) -> str | None:
+    address = raw.get("address")
+    if isinstance(address, str):
+        return address
+
+    if isinstance(address, dict):
+        # Nominatim addressdetails
+        street = " ".join(
+            part for part in (address.get("road"), address.get("house_number")) if part
+        )
+        city = address.get("city") or address.get("town") or address.get("village")
+        parts = [part for part in (street, city) if part]
+        if parts:
+            return ", ".join(parts)
+
+    street = " ".join(
+        part for part in (tags.get("addr:street"), tags.get("addr:housenumber")) if part
+    )
+    parts = [part for part in (street, tags.get("addr:city")) if part]
+    if parts:
+        return ", ".join(parts)
+
+    display_name = raw.get("display_name")
+    if display_name:
+        return display_name.removeprefix(name).lstrip(", ")
+    return None
+
+
+def normalize(raw: dict, source: str) -> dict | None:
+    """Строка выгрузки -> колонки Clinic; None, если нет имени или координат."""
+    if not isinstance(raw, dict):
+        return None
+
+    tags = raw.get("tags") or raw.get("properties") or {}
+    extratags = raw.get("extratags") or {}
+
+    name = _clean(
+        raw.get("name") or tags.get("name") or (raw.get("display_name") or "").split(",")[0],
+        255,
+    )
+    lat, lng = _coordinates(raw)
+    if not name or lat is None or lng is None:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+
+    row = {
+        "name": name,
+        "address": _clean(_address(raw, tags, name), 255),
+        "phone": _clean(
+            raw.get("phone")
+            or tags.get("phone")
+            or tags.get("contact:phone")
+            or extratags.get("phone"),
+            50,
+        ),
+        "lat": lat,
+        "lng": lng,
+        "source": source,
+        "dedup_key": clinic_key(name, lat, lng),
+    }
+    row["content_hash"] = hashlib.blake2b(
+        "|".join(
+            str(row[key]) for key in ("name", "address", "phone", "lat", "lng", "source")
+        ).encode(),
+        digest_size=16,
+    ).hexdigest()
+    return row
+
+
+def normalized(
+    records: Iterable[dict], source: str, stats: ImportStats
+) -> Iterator[dict]:
+    """Валидные строки без дублей внутри выгрузки (первая побеждает)."""
+    seen = set()
+    for raw in records:
+        stats.read += 1
+        row = normalize(raw, source)
+        if row is None:
+            stats.invalid += 1
+        elif row["dedup_key"] in seen:
+            stats.duplicates += 1
+        else:
+            seen.add(row["dedup_key"])
+            yield row
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# =========================
+# Upsert
+# =========================
+
+async def upsert_batch(
+    session: AsyncSession, batch: list[dict], stats: ImportStats
+) -> None:
+    """
+    Одна транзакция на пачку: SELECT существующих по ключу, INSERT новых,
+    UPDATE изменившихся. Неизменные строки не трогаются.
+    """
+    result = await session.execute(
+        select(Clinic.dedup_key, Clinic.id, Clinic.content_hash).where(
+            Clinic.dedup_key.in_([row["dedup_key"] for row in batch])
+        )
+    )
+    existing = {key: (clinic_id, content_hash) for key, clinic_id, content_hash in result}
+
+    new, changed = [], []
+    for row in batch:
+        found = existing.get(row["dedup_key"])
+        if found is None:
+            new.append({"id": str(uuid.uuid4()), **row})
+        elif found[1] != row["content_hash"]:
+            changed.append({"id": found[0], **row})
+        else:
+            stats.unchanged += 1
+
+    if new:
+        await session.execute(insert(Clinic), new)
+    if changed:
+        # ORM bulk UPDATE по первичному ключу (executemany)
+        await session.execute(update(Clinic), changed)
+    await session.commit()
+
+    stats.inserted += len(new)
+    stats.updated += len(changed)
+
+
+async def import_clinics(
+    session_factory: async_sessionmaker,
+    records: Iterable[dict],
+    source: str,
+    batch_size: int = BATCH_SIZE,
+    progress: bool = False,
+) -> ImportStats:
+    stats = ImportStats()
+    started = time.perf_counter()
+
+    async with session_factory() as session:
+        try:
+            for batch in batched(normalized(records, source, stats), batch_size):
+                await upsert_batch(session, batch, stats)
+                stats.seconds = time.perf_counter() - started
+                if progress:
+                    print(
+                        f"📥 {stats.read} rows, +{stats.inserted} ~{stats.updated} "
+                        f"={stats.unchanged} ({stats.rows_per_sec} rows/s)"
+                    )
+        finally:
+            # Кэш поиска сбрасывается один раз за импорт, а не на каждую
+            # пачку; при ошибке — тоже, если часть пачек уже сохранена
+            if stats.inserted or stats.updated:
+                await session.rollback()
+                await clinic_cache.invalidate(session)
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[dict]:
+    if fmt not in READERS:
+        raise ValueError(f"Unknown format: {fmt}")
+    return READERS[fmt](stream)
+
+
+def text_stream(binary) -> TextIO:
+    """Текстовый поток поверх загруженного файла (в т.ч. gzip)."""
+    head = binary.read(2)
+    binary.seek(0)
+    if head == b"\x1f\x8b":
+        binary = gzip.GzipFile(fileobj=binary, mode="rb")
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+# =========================
+# CLI
+# =========================
+
+async def main_async(args) -> None:
+    from db import SessionLocal, engine, wait_for_db
+    from migrations import ensure_schema
+
+    await wait_for_db()
+    await ensure_schema(engine)
+
+    fmt = args.format or detect_format(args.path)
+    with open_text(args.path) as stream:
+        stats = await import_clinics(
+            SessionLocal,
+            read_records(stream, fmt),
+            args.source or ("csv" if fmt == "csv" else "nominatim"),
+            args.batch_size,
+            progress=True,
+        )
+
+    await engine.dispose()
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--source", help="значение Clinic.source")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    asyncio.run(main_async(parser.parse_args()))
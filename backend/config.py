@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +9,102 @@ class Settings(BaseSettings):
     database_url: str
     jwt_secret: str = "super_secret_key_change_me"
 
+    # Кэш pet_id -> владелец для проверок доступа (0 — выключен).
+    # TTL (с) ограничивает, сколько воркер без общего транспорта
+    # change_bus помнит питомца, удалённого в другом воркере
+    pet_owner_cache_size: int = 10_000
+    pet_owner_cache_ttl: float = 30.0
+
+    # Кэш пользователя для current_user (0 — выключен)
+    user_cache_size: int = 10_000
+    user_cache_ttl: float = 30.0
+
+    # Хэширование паролей: потоки пула (0 — в event loop) и параметры argon2.
+    # При смене параметров хэш перегенерируется при следующем входе.
+    password_hash_workers: int = 4
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+
+    # Тестовые данные при старте (только для разработки)
+    seed_test_data: bool = False
+
+    # Ожидание БД при старте: попытки с экспоненциальной задержкой
+    db_connect_retries: int = 10
+    db_connect_backoff: float = 0.5
+    db_connect_backoff_max: float = 15.0
+    # Сколько соединений открыть заранее
+    db_warmup_connections: int = 5
+
+    # Пул соединений
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
+    # Порог для журнала медленных запросов (petify.slow_query)
+    slow_query_ms: float = 200.0
+
+    # Бюджеты запросов (@query_budget): off | warn | raise.
+    # raise — для тестов и бенчмарков: превышение роняет запрос
+    query_budget_mode: Literal["off", "warn", "raise"] = "off"
+    # Сколько одинаковых запросов за HTTP-запрос считать N+1
+    query_repeat_threshold: int = 3
+
+    # Индексы поиска в памяти (не MySQL): сколько пользователей держать
+    search_index_cache_size: int = 1000
+
+    # Кэш поиска клиник по тайлам: записей в памяти процесса и TTL (с).
+    # С Redis-совместимым URL кэш общий для всех воркеров
+    clinic_cache_size: int = 5000
+    clinic_cache_ttl: float = 3600.0
+    clinic_cache_redis_url: str | None = None
+    # Как часто воркер сверяет поколение кэша с БД (с)
+    clinic_cache_check_interval: float = 5.0
+
+    # Напоминания (события type=reminder): окно загрузки, период
+    # перечитывания окна и сколько ждать пропущенные при простое (с)
+    reminders_enabled: bool = True
+    reminder_lookahead: float = 900.0
+    reminder_refresh: float = 300.0
+    reminder_grace: float = 3600.0
+    # Куда отправлять: log | webhook (POST JSON на reminder_webhook_url) | memory
+    reminder_sink: Literal["log", "webhook", "memory"] = "log"
+    reminder_webhook_url: str | None = None
+    # Сколько напоминаний отправляется одновременно
+    reminder_send_concurrency: int = 20
+
+    # Поток изменений (GET /events/stream): очередь на подписку,
+    # период пинга (с); с Redis-совместимым URL изменения видны всем воркерам
+    change_stream_queue_size: int = 100
+    change_stream_heartbeat: float = 15.0
+    change_stream_redis_url: str | None = None
+    # Изменения, ждущие отправки в Redis; при переполнении отбрасываются
+    change_stream_outbox_size: int = 1000
+    # Таймаут подключения и команды Redis-совместимого сервера (с)
+    redis_timeout: float = 1.0
+
+    # Удаление питомца: с каким числом событий — в фоне, пачками
+    # по pet_delete_batch_size с паузой pet_delete_pause (с) между ними
+    pet_delete_background_threshold: int = 10_000
+    pet_delete_batch_size: int = 1000
+    pet_delete_pause: float = 0.05
+
+    # Архив событий: done / cancelled разовые события старше
+    # archive_after_days переносятся в events_archive раз в archive_interval (с)
+    # пачками по archive_batch_size. Уменьшать порог можно в любой момент;
+    # при увеличении события между старым и новым порогом остаются в архиве
+    # и не видны окнам, начинающимся после нового порога
+    archive_enabled: bool = True
+    archive_after_days: int = 90
+    archive_interval: float = 3600.0
+    archive_batch_size: int = 1000
+    archive_pause: float = 0.05
+
+    # Реплика для чтения (GET/HEAD); пусто — всё в primary
+    database_replica_url: str | None = None
+
     cors_origins: list[str] = [
         "http://localhost:3000",
         "http://localhost:5173",
@@ -1,16 +1,139 @@
+import asyncio
+import random
+import time
 from collections.abc import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from fastapi import Request
+from sqlalchemy import exc, make_url, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
+from metrics import Histogram
 
-engine = create_async_engine(settings.database_url, echo=False)
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """QueuePool с гистограммой ожидания соединения и счётчиком таймаутов."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait.observe(time.perf_counter() - started)
+
+
+def make_engine(url: str) -> AsyncEngine:
+    # SQLite (локальные бенчмарки) остаётся на пуле по умолчанию
+    if make_url(url).get_backend_name() == "sqlite":
+        return create_async_engine(url, echo=False)
+
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=MeteredPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+
+engine = make_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# Реплика только для чтения; без неё всё идёт в primary
+replica_engine = (
+    make_engine(settings.database_replica_url)
+    if settings.database_replica_url
+    else None
+)
+ReplicaSessionLocal = (
+    async_sessionmaker(replica_engine, expire_on_commit=False)
+    if replica_engine is not None
+    else SessionLocal
+)
+
+READ_METHODS = {"GET", "HEAD"}
+
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    GET/HEAD читают из реплики (если настроена), остальное — из primary.
+    Реплика может отставать: сразу после записи GET может вернуть старые данные.
+    """
+    factory = ReplicaSessionLocal if request.method in READ_METHODS else SessionLocal
+    async with factory() as session:
+        yield session
+
+
+async def get_primary_session() -> AsyncGenerator[AsyncSession, None]:
+    """Для чтений, которым нужна свежая запись (read-your-writes)."""
     async with SessionLocal() as session:
         yield session
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, MeteredPool):
+        return {"pool": pool.status()}
+
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeouts": pool.timeouts,
+        "wait_seconds": pool.wait.snapshot(),
+    }
+
+
+async def wait_for_db() -> None:
+    """Ждёт доступности БД: экспоненциальная задержка с джиттером."""
+    delay = settings.db_connect_backoff
+    for attempt in range(1, settings.db_connect_retries + 1):
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            return
+        except (DBAPIError, OSError) as exc:
+            if attempt == settings.db_connect_retries:
+                raise RuntimeError("❌ Database is not available") from exc
+            print(f"⏳ Waiting for DB ({attempt}/{settings.db_connect_retries})")
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, settings.db_connect_backoff_max)
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Открывает соединения заранее и возвращает их в пул,
+    чтобы первые запросы не платили за connect.
+    """
+    conns = []
+    try:
+        for _ in range(connections):
+            conn = await engine.connect()
+            conns.append(conn)
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conns:
+            await conn.close()
@@ -0,0 +1,92 @@
+import heapq
+import math
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Clinic
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Расстояние по дуге большого круга в метрах."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(
+    lat: float, lng: float, radius_m: float
+) -> tuple[float, float, float, float]:
+    """
+    Прямоугольник (min_lat, max_lat, min_lng, max_lng), гарантированно
+    содержащий круг радиуса radius_m. Долготы могут выходить за ±180 —
+    это обрабатывает lng_condition.
+    """
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    min_lat = lat - d_lat
+    max_lat = lat + d_lat
+
+    # Круг накрывает полюс — по долготе ограничений нет
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    ratio = math.sin(radius_m / EARTH_RADIUS_M) / math.cos(math.radians(lat))
+    d_lng = math.degrees(math.asin(min(1.0, ratio)))
+    return min_lat, max_lat, lng - d_lng, lng + d_lng
+
+
+def lng_condition(min_lng: float, max_lng: float):
+    # Прямоугольник пересекает антимеридиан — два диапазона
+    if min_lng < -180:
+        return or_(Clinic.lng >= min_lng + 360, Clinic.lng <= max_lng)
+    if max_lng > 180:
+        return or_(Clinic.lng >= min_lng, Clinic.lng <= max_lng - 360)
+    return Clinic.lng.between(min_lng, max_lng)
+
+
+# Колонки клиники для кэша поиска: строки-кортежи вместо ORM-объектов
+CLINIC_FIELDS = ("id", "name", "address", "phone", "lat", "lng", "source")
+
+
+async def clinic_rows_in_circle(
+    session: AsyncSession, lat: float, lng: float, radius_m: float
+) -> list[tuple]:
+    """
+    Строки клиник (CLINIC_FIELDS) из bounding box круга — надмножество
+    клиник в радиусе, без точной фильтрации.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_m)
+    result = await session.execute(
+        select(*(getattr(Clinic, name) for name in CLINIC_FIELDS)).where(
+            and_(
+                Clinic.lat.between(min_lat, max_lat),
+                lng_condition(min_lng, max_lng),
+            )
+        )
+    )
+    return [tuple(row) for row in result]
+
+
+def nearest_rows(
+    rows: list[tuple], lat: float, lng: float, radius_m: float, limit: int
+) -> list[tuple[tuple, float]]:
+    """limit ближайших строк в радиусе radius_m: (строка, расстояние)."""
+    lat_index = CLINIC_FIELDS.index("lat")
+    candidates = (
+        (row, haversine_m(lat, lng, row[lat_index], row[lat_index + 1]))
+        for row in rows
+    )
+    return heapq.nsmallest(
+        limit,
+        (item for item in candidates if item[1] <= radius_m),
+        key=lambda item: item[1],
+    )
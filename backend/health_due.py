@@ -0,0 +1,282 @@
+"""
+Сроки прививок и обработок.
+
+Запись медкарты относится к виду (бешенство, комплексная прививка,
+глистогонка, обработка от блох и клещей; прочие прививки — vaccination)
+по ключевым словам типа, названия и описания. Срок следующей — дата
+записи плюс интервал правила для вида животного и вида прививки.
+
+Таблица health_due хранит по строке на (питомец, вид) и обновляется
+в create / update / delete записи: пересчитывается только затронутая
+строка, и только если изменилась последняя запись этого вида.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import HealthDue, HealthRecord, Pet
+
+# =========================
+# Rules
+# =========================
+
+@dataclass(frozen=True)
+class Kind:
+    name: str
+    title: str
+    keywords: tuple[str, ...]
+
+
+# Порядок важен: первый совпавший вид побеждает
+KINDS = (
+    Kind("rabies", "Бешенство", ("бешенств", "rabies", "rabisin", "рабикан")),
+    Kind(
+        "complex",
+        "Комплексная прививка",
+        ("комплексн", "dhpp", "dhppi", "fvrcp", "tricat", "мультикан", "нобивак dhp"),
+    ),
+    Kind(
+        "deworming",
+        "Обработка от глистов",
+        ("глист", "гельминт", "дегельм", "deworm", "мильбемакс", "празицид", "дронтал"),
+    ),
+    Kind(
+        "ectoparasites",
+        "Обработка от блох и клещей",
+        ("блох", "клещ", "flea", "tick", "бравекто", "nexgard", "некстгард", "фронтлайн"),
+    ),
+)
+VACCINATION = Kind("vaccination", "Вакцинация", ())
+KIND_TITLES = {kind.name: kind.title for kind in (*KINDS, VACCINATION)}
+
+# Признаки прививки в типе записи (на фронте — «Вакцинация»)
+VACCINATION_TYPES = ("vaccin", "вакцин", "привив")
+
+SPECIES = {
+    "cat": ("кот", "кош", "cat", "kitten"),
+    "dog": ("собак", "пёс", "пес", "щен", "dog", "puppy"),
+}
+
+# (вид животного, вид прививки) -> интервал в днях; "*" — любой вид животного
+INTERVALS = {
+    ("*", "rabies"): 365,
+    ("*", "complex"): 365,
+    ("*", "vaccination"): 365,
+    ("*", "deworming"): 180,
+    ("cat", "deworming"): 90,
+    ("dog", "deworming"): 90,
+    ("*", "ectoparasites"): 60,
+    ("dog", "ectoparasites"): 30,
+}
+
+
+def species_key(species: str | None) -> str:
+    value = (species or "").casefold()
+    for key, words in SPECIES.items():
+        if value.startswith(words):
+            return key
+    return "*"
+
+
+def interval(species: str | None, kind: str) -> timedelta:
+    days = INTERVALS.get((species_key(species), kind)) or INTERVALS[("*", kind)]
+    return timedelta(days=days)
+
+
+def classify(record_type: str | None, title: str | None, details: str | None) -> str | None:
+    text = " ".join(part for part in (record_type, title, details) if part).casefold()
+    for kind in KINDS:
+        if any(word in text for word in kind.keywords):
+            return kind.name
+    if any(word in (record_type or "").casefold() for word in VACCINATION_TYPES):
+        return VACCINATION.name
+    return None
+
+
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d.%m.%y")
+
+
+def parse_date(value: str | None) -> date | None:
+    value = (value or "").strip()
+    # "2024-03-12T10:00" и подобное — берём дату
+    value = re.split(r"[T\s]", value, maxsplit=1)[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def track(record: HealthRecord) -> None:
+    """Заполняет due_kind / performed_on записи (до flush)."""
+    record.due_kind = classify(record.record_type, record.title, record.details)
+    record.performed_on = None
+    if record.due_kind is not None:
+        record.performed_on = (
+            parse_date(record.record_date)
+            or (record.created_at or datetime.utcnow()).date()
+        )
+
+
+# =========================
+# Incremental maintenance
+# =========================
+
+def _point(due: HealthDue, pet: Pet, record_id: str, performed_on: date) -> None:
+    due.record_id = record_id
+    due.last_date = performed_on
+    due.due_date = performed_on + interval(pet.species, due.kind)
+
+
+def _advance(
+    session: AsyncSession,
+    due: HealthDue | None,
+    pet: Pet,
+    kind: str,
+    record_id: str,
+    performed_on: date,
+) -> None:
+    """Сдвинуть срок вида, если запись не старше той, от которой он считан."""
+    if due is None:
+        due = HealthDue(pet_id=pet.id, kind=kind, user_id=pet.user_id)
+        _point(due, pet, record_id, performed_on)
+        session.add(due)
+    elif performed_on >= due.last_date:
+        _point(due, pet, record_id, performed_on)
+
+
+async def _latest(
+    session: AsyncSession, pet_id: str, kind: str, exclude_id: str
+) -> HealthRecord | None:
+    # Одна строка по ix_health_records_due
+    return await session.scalar(
+        select(HealthRecord)
+        .where(
+            HealthRecord.pet_id == pet_id,
+            HealthRecord.due_kind == kind,
+            HealthRecord.id != exclude_id,
+        )
+        .order_by(HealthRecord.performed_on.desc(), HealthRecord.created_at.desc())
+        .limit(1)
+    )
+
+
+async def record_added(session: AsyncSession, pet: Pet, record: HealthRecord) -> None:
+    if record.due_kind is None:
+        return
+    if record.id is None:
+        # id нужен для health_due.record_id
+        await session.flush()
+    due = await session.get(HealthDue, (pet.id, record.due_kind))
+    _advance(session, due, pet, record.due_kind, record.id, record.performed_on)
+
+
+async def rows_added(session: AsyncSession, pet: Pet, rows: list[dict]) -> None:
+    """
+    После массовой вставки (строки уже с id): вид и дата записей одним
+    executemany и по одной самой новой записи на вид в health_due.
+    """
+    tracked = []
+    newest = {}
+    for row in rows:
+        kind = classify(row["record_type"], row["title"], row["details"])
+        if kind is None:
+            continue
+        item = {
+            "id": row["id"],
+            "due_kind": kind,
+            "performed_on": parse_date(row["record_date"]) or datetime.utcnow().date(),
+        }
+        tracked.append(item)
+        if kind not in newest or item["performed_on"] >= newest[kind]["performed_on"]:
+            newest[kind] = item
+    if not tracked:
+        return
+
+    # Отдельно от INSERT: строки с NULL в этих колонках ORM вставляет
+    # другим statement'ом, и вставка распалась бы на группы
+    await session.execute(update(HealthRecord), tracked)
+
+    # Все затронутые строки health_due одним запросом
+    result = await session.scalars(
+        select(HealthDue).where(HealthDue.pet_id == pet.id, HealthDue.kind.in_(newest))
+    )
+    existing = {due.kind: due for due in result}
+    for kind, item in newest.items():
+        _advance(session, existing.get(kind), pet, kind, item["id"], item["performed_on"])
+
+
+async def record_removed(
+    session: AsyncSession, pet: Pet, kind: str | None, record_id: str
+) -> None:
+    """Если срок считался от удалённой записи — берём предыдущую запись вида."""
+    if kind is None:
+        return
+
+    due = await session.get(HealthDue, (pet.id, kind))
+    if due is None or due.record_id != record_id:
+        return
+
+    previous = await _latest(session, pet.id, kind, record_id)
+    if previous is None:
+        await session.delete(due)
+    else:
+        _point(due, pet, previous.id, previous.performed_on)
+
+
+async def record_changed(
+    session: AsyncSession,
+    pet: Pet,
+    record: HealthRecord,
+    old_kind: str | None,
+    old_date: date | None,
+) -> None:
+    """Запись изменена: вид или дата могли смениться."""
+    if (old_kind, old_date) == (record.due_kind, record.performed_on):
+        return
+
+    if old_kind is not None and old_kind != record.due_kind:
+        await record_removed(session, pet, old_kind, record.id)
+    if record.due_kind is None:
+        return
+
+    due = await session.get(HealthDue, (pet.id, record.due_kind))
+    if (
+        due is not None
+        and due.record_id == record.id
+        and record.performed_on < due.last_date
+    ):
+        # Дату последней записи сдвинули назад — возможно, последней стала другая
+        previous = await _latest(session, pet.id, record.due_kind, record.id)
+        if previous is not None and previous.performed_on > record.performed_on:
+            _point(due, pet, previous.id, previous.performed_on)
+        else:
+            _point(due, pet, record.id, record.performed_on)
+    else:
+        _advance(session, due, pet, record.due_kind, record.id, record.performed_on)
+
+
+async def species_changed(session: AsyncSession, pet: Pet) -> None:
+    """Интервалы зависят от вида животного — пересчитать сроки питомца."""
+    result = await session.scalars(select(HealthDue).where(HealthDue.pet_id == pet.id))
+    for due in result:
+        due.due_date = due.last_date + interval(pet.species, due.kind)
+
+
+def due_item(due: HealthDue, today: date, pet_name: str | None = None) -> dict:
+    """Строка health_due -> DueRead."""
+    return {
+        "pet_id": due.pet_id,
+        "pet_name": pet_name,
+        "kind": due.kind,
+        "title": KIND_TITLES.get(due.kind, due.kind),
+        "record_id": due.record_id,
+        "last_date": due.last_date,
+        "due_date": due.due_date,
+        "days_left": (due.due_date - today).days,
+        "overdue": due.due_date < today,
+    }
@@ -1,5 +1,30 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+
 from fastapi import HTTPException
 
 
 def not_found(entity: str):
-    raise HTTPException(status_code=404, detail=f"{entity} not found")
\ No newline at end of file
+    raise HTTPException(status_code=404, detail=f"{entity} not found")
+
+
+def naive_utc(value: datetime) -> datetime:
+    """
+    Все даты в БД хранятся как naive UTC (см. datetime.utcnow в моделях).
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def clinic_key(name: str | None, lat: float | None, lng: float | None) -> str | None:
+    """
+    Ключ дедупликации клиник: нормализованное название
+    и координаты, округлённые до 4 знаков (~10 м).
+    """
+    if not name or lat is None or lng is None:
+        return None
+    words = re.findall(r"\w+", name.casefold().replace("ё", "е"))
+    raw = f"{' '.join(words)}|{round(lat, 4):.4f}|{round(lng, 4):.4f}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
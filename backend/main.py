@@ -1,15 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from routers import auth_routes
 from config import settings
-from db import engine, Base, SessionLocal
+from db import engine, replica_engine, SessionLocal, wait_for_db, warm_pool
+from changes import change_bus
+from archive import event_archiver
+from migrations import ensure_schema
+from pet_deletion import pet_deleter
+from reminders import reminder_scheduler
 from seed import seed_test_data
-import asyncio
-from sqlalchemy.exc import OperationalError
+from telemetry import MetricsMiddleware, instrument_engine
 
 # auth
-from auth import fastapi_users, auth_backend
+from auth import fastapi_users, fastapi_users_uncached, auth_backend
 from schemas import UserRead, UserCreate, UserUpdate
 
 # routers
@@ -21,12 +26,17 @@ from routers import (
     health_records,
     events,
     clinics,
+    admin,
+    health,
+    metrics,
+    search,
 )
 
 app = FastAPI(
     title="Petify API",
     description="Web application for managing pets and their schedules",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # -------------------------
@@ -38,44 +48,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # -------------------------
-# Startup: create tables
+# Metrics: латентность, статусы и SQL по маршрутам
 # -------------------------
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine)
+
+# -------------------------
+# Startup: schema, seed, pool
+# -------------------------
+app.state.ready = False
+
 
 @app.on_event("startup")
 async def on_startup():
-    retries = 10
-
-    for i in range(retries):
-        try:
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
-
-            async with SessionLocal() as session:
-                await seed_test_data(session)
-
-            print("✅ Database ready and test data seeded")
-            break
-        except OperationalError:
-            print(f"⏳ Waiting for DB ({i + 1}/{retries})")
-            await asyncio.sleep(2)
-    retries = 10
-    delay = 2
-
-    for attempt in range(retries):
-        try:
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
-            print("✅ Database connected")
-            break
-        except OperationalError:
-            print(f"⏳ Waiting for DB... ({attempt + 1}/{retries})")
-            await asyncio.sleep(delay)
-    else:
-        raise RuntimeError("❌ Database is not available")
+    await wait_for_db()
+
+    if await ensure_schema(engine):
+        print("✅ Database schema updated")
+
+    if settings.seed_test_data:
+        async with SessionLocal() as session:
+            await seed_test_data(session)
+
+    await warm_pool(engine, settings.db_warmup_connections)
+    if replica_engine is not None:
+        await warm_pool(replica_engine, settings.db_warmup_connections)
+    app.state.ready = True
+    print("✅ Database ready")
+
+    change_bus.start()
+
+    if settings.reminders_enabled:
+        reminder_scheduler.start()
+        print("⏰ Reminder scheduler started")
+
+    if settings.archive_enabled:
+        event_archiver.start()
+        print("🗄️ Event archiver started")
+
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await reminder_scheduler.stop()
+    await pet_deleter.stop()
+    await event_archiver.stop()
+    await change_bus.stop()
 
 
 # -------------------------
@@ -94,10 +117,10 @@ app.include_router(
 )
 
 # -------------------------
-# Users
+# Users (без кэша пользователя: смена пароля, почты, деактивация)
 # -------------------------
 app.include_router(
-    fastapi_users.get_users_router(UserRead, UserUpdate),
+    fastapi_users_uncached.get_users_router(UserRead, UserUpdate),
     prefix="/users",
     tags=["Users"],
 )
@@ -111,6 +134,10 @@ app.include_router(habits.router)
 app.include_router(health_records.router)
 app.include_router(events.router)
 app.include_router(clinics.router)
+app.include_router(search.router)
+app.include_router(admin.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
 
 
 # -------------------------
@@ -0,0 +1,355 @@
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import DateTime, delete, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from db import Base
+from health_due import classify, interval, parse_date
+from helpers import clinic_key, naive_utc
+from models import HealthDue, SchemaVersion
+from search import SOURCES
+
+BATCH_SIZE = 1000
+
+
+# =========================
+# Steps
+# =========================
+
+async def _columns(conn: AsyncConnection, table: str) -> dict:
+    return await conn.run_sync(
+        lambda sync_conn: {
+            col["name"]: col["type"]
+            for col in inspect(sync_conn).get_columns(table)
+        }
+    )
+
+
+async def _add_missing_columns(
+    conn: AsyncConnection, table: str, columns: dict[str, str]
+) -> None:
+    existing = await _columns(conn, table)
+    for name, ddl in columns.items():
+        if name not in existing:
+            print(f"🔧 Adding column {table}.{name}")
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def _parse_datetime(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return naive_utc(datetime.fromisoformat(value))
+    except ValueError:
+        return None
+
+
+async def events_native_datetimes(conn: AsyncConnection) -> None:
+    """events.start_at / end_at: String(30) -> DATETIME."""
+    columns = await _columns(conn, "events")
+    if isinstance(columns["start_at"], DateTime):
+        return
+
+    print("🔧 Migrating events.start_at/end_at to DATETIME")
+    await conn.execute(text("ALTER TABLE events ADD COLUMN start_at_dt DATETIME NULL"))
+    await conn.execute(text("ALTER TABLE events ADD COLUMN end_at_dt DATETIME NULL"))
+
+    last_id = ""
+    while True:
+        rows = (
+            await conn.execute(
+                text(
+                    "SELECT id, start_at, end_at, created_at FROM events "
+                    "WHERE id > :last_id ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+        ).all()
+        if not rows:
+            break
+
+        await conn.execute(
+            text(
+                "UPDATE events SET start_at_dt = :start_at, end_at_dt = :end_at "
+                "WHERE id = :id"
+            ),
+            [
+                {
+                    "id": row.id,
+                    # Нераспознанная дата старта — берём дату создания
+                    "start_at": _parse_datetime(row.start_at) or row.created_at,
+                    "end_at": _parse_datetime(row.end_at),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    for column in ("start_at", "end_at"):
+        await conn.execute(text(f"ALTER TABLE events DROP COLUMN {column}"))
+        await conn.execute(
+            text(f"ALTER TABLE events RENAME COLUMN {column}_dt TO {column}")
+        )
+
+    if conn.dialect.name == "mysql":
+        await conn.execute(text("ALTER TABLE events MODIFY start_at DATETIME NOT NULL"))
+
+
+async def events_recurrence(conn: AsyncConnection) -> None:
+    """Правила повторения серий (таблица event_overrides создаётся create_all)."""
+    await _add_missing_columns(
+        conn,
+        "events",
+        {
+            "recurrence": "JSON NULL",
+            "series_until": "DATETIME NULL",
+        },
+    )
+
+
+async def events_reminders(conn: AsyncConnection) -> None:
+    """Отметка выданных напоминаний (индекс окна — в ensure_indexes)."""
+    await _add_missing_columns(conn, "events", {"reminded_at": "DATETIME NULL"})
+
+
+async def clinics_import_keys(conn: AsyncConnection) -> None:
+    """
+    Ключи импорта клиник. Существующим строкам ключ проставляется
+    пачками; у дублей он остаётся NULL, иначе не создать уникальный индекс.
+    """
+    columns = await _columns(conn, "clinics")
+    if "dedup_key" in columns:
+        return
+
+    await _add_missing_columns(
+        conn,
+        "clinics",
+        {
+            "dedup_key": "VARCHAR(32) NULL",
+            "content_hash": "VARCHAR(32) NULL",
+        },
+    )
+
+    seen = set()
+    last_id = ""
+    while True:
+        rows = (
+            await conn.execute(
+                text(
+                    "SELECT id, name, lat, lng FROM clinics "
+                    "WHERE id > :last_id ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            key = clinic_key(row.name, row.lat, row.lng)
+            if key is not None and key not in seen:
+                seen.add(key)
+                updates.append({"id": row.id, "dedup_key": key})
+        if updates:
+            await conn.execute(
+                text("UPDATE clinics SET dedup_key = :dedup_key WHERE id = :id"),
+                updates,
+            )
+        last_id = rows[-1].id
+
+
+async def health_due_backfill(conn: AsyncConnection) -> None:
+    """
+    Вид и дата прививки / обработки для существующих записей медкарты
+    и начальное заполнение health_due (дальше оно ведётся в ручках).
+    """
+    columns = await _columns(conn, "health_records")
+    if "due_kind" in columns:
+        return
+
+    await _add_missing_columns(
+        conn,
+        "health_records",
+        {
+            "due_kind": "VARCHAR(30) NULL",
+            "performed_on": "DATE NULL",
+        },
+    )
+
+    # (pet_id, kind) -> строка health_due от самой новой записи
+    latest = {}
+    last_id = ""
+    while True:
+        rows = (
+            await conn.execute(
+                text(
+                    "SELECT r.id, r.pet_id, r.record_type, r.title, r.details, "
+                    "r.record_date, r.created_at, p.species, p.user_id "
+                    "FROM health_records r JOIN pets p ON p.id = r.pet_id "
+                    "WHERE r.id > :last_id ORDER BY r.id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            kind = classify(row.record_type, row.title, row.details)
+            if kind is None:
+                continue
+
+            created_at = row.created_at
+            if isinstance(created_at, str):
+                created_at = _parse_datetime(created_at)
+            performed_on = parse_date(row.record_date) or (
+                created_at or datetime.utcnow()
+            ).date()
+            updates.append(
+                {"id": row.id, "due_kind": kind, "performed_on": performed_on}
+            )
+
+            key = (row.pet_id, kind)
+            if key not in latest or performed_on >= latest[key]["last_date"]:
+                latest[key] = {
+                    "pet_id": row.pet_id,
+                    "kind": kind,
+                    "user_id": row.user_id,
+                    "record_id": row.id,
+                    "last_date": performed_on,
+                    "due_date": performed_on + interval(row.species, kind),
+                }
+        if updates:
+            await conn.execute(
+                text(
+                    "UPDATE health_records SET due_kind = :due_kind, "
+                    "performed_on = :performed_on WHERE id = :id"
+                ),
+                updates,
+            )
+        last_id = rows[-1].id
+
+    values = list(latest.values())
+    for start in range(0, len(values), BATCH_SIZE):
+        await conn.execute(
+            HealthDue.__table__.insert(), values[start:start + BATCH_SIZE]
+        )
+
+
+async def ensure_indexes(conn: AsyncConnection) -> None:
+    """create_all не добавляет индексы в уже существующие таблицы."""
+
+    def create_missing(sync_conn) -> None:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(sync_conn, checkfirst=True)
+
+    await conn.run_sync(create_missing)
+
+
+async def search_fulltext(conn: AsyncConnection) -> None:
+    """FULLTEXT-индексы для /search (только MySQL; SQLite ищет в памяти)."""
+    if conn.dialect.name != "mysql":
+        return
+
+    for source in SOURCES:
+        table = source.model.__tablename__
+        existing = await conn.run_sync(
+            lambda sync_conn: {
+                index["name"] for index in inspect(sync_conn).get_indexes(table)
+            }
+        )
+        if source.index_name in existing:
+            continue
+
+        print(f"🔧 Adding FULLTEXT index {source.index_name}")
+        await conn.execute(
+            text(
+                f"CREATE FULLTEXT INDEX {source.index_name} "
+                f"ON {table} ({', '.join(source.fields)})"
+            )
+        )
+
+
+MIGRATIONS = [
+    events_native_datetimes,
+    events_recurrence,
+    clinics_import_keys,
+    events_reminders,
+    health_due_backfill,
+    ensure_indexes,
+    search_fulltext,
+]
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    for migration in MIGRATIONS:
+        await migration(conn)
+
+
+# =========================
+# Schema version
+# =========================
+
+def schema_fingerprint() -> str:
+    """
+    Отпечаток моделей и списка миграций: меняется при любом изменении
+    таблиц, колонок, индексов или добавлении шага миграции.
+    """
+    parts = [migration.__name__ for migration in MIGRATIONS]
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{col.name}:{col.type!r}:{col.nullable}" for col in table.c)
+        parts.extend(
+            f"{index.name}:{','.join(col.name for col in index.columns)}"
+            for index in sorted(table.indexes, key=lambda index: index.name)
+        )
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+async def _stored_fingerprint(conn: AsyncConnection) -> str | None:
+    try:
+        return await conn.scalar(
+            select(SchemaVersion.fingerprint).where(SchemaVersion.id == 1)
+        )
+    except DBAPIError:
+        # Таблицы ещё нет — свежая БД
+        return None
+
+
+async def ensure_schema(engine: AsyncEngine) -> bool:
+    """
+    Приводит схему к текущим моделям. Если отпечаток в БД совпадает,
+    обходится одним SELECT. Возвращает True, если выполнялся DDL.
+    """
+    fingerprint = schema_fingerprint()
+    async with engine.connect() as conn:
+        if await _stored_fingerprint(conn) == fingerprint:
+            return False
+
+    async with engine.begin() as conn:
+        # Реплики стартуют одновременно — DDL выполняет только одна
+        locked = conn.dialect.name == "mysql"
+        if locked:
+            await conn.execute(text("SELECT GET_LOCK('petify_schema', 120)"))
+        try:
+            if await _stored_fingerprint(conn) == fingerprint:
+                return False
+
+            await conn.run_sync(Base.metadata.create_all)
+            await run_migrations(conn)
+
+            await conn.execute(delete(SchemaVersion))
+            await conn.execute(
+                SchemaVersion.__table__.insert().values(
+                    id=1, fingerprint=fingerprint, applied_at=datetime.utcnow()
+                )
+            )
+        finally:
+            if locked:
+                await conn.execute(text("SELECT RELEASE_LOCK('petify_schema')"))
+    return True
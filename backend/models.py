@@ -1,18 +1,24 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
 from sqlalchemy import (
+    BigInteger,
+    Date,
     String,
     ForeignKey,
     Boolean,
     DateTime,
     Text,
     Float,
+    Index,
+    JSON,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTableUUID
 
 from db import Base
+from helpers import clinic_key
 
 
 # =========================
@@ -34,6 +40,57 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
     )
 
 
+# =========================
+# Версия схемы БД
+# =========================
+class SchemaVersion(Base):
+    """
+    Отпечаток схемы, к которой приведена БД (см. migrations.ensure_schema).
+    Одна строка с id = 1.
+    """
+
+    __tablename__ = "schema_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    applied_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow
+    )
+
+
+# =========================
+# Версия данных пользователя
+# =========================
+class DataVersion(Base):
+    """
+    Счётчик изменений данных пользователя.
+    Увеличивается каждой записью, используется для ETag.
+    """
+
+    __tablename__ = "data_versions"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("users.id"), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+# =========================
+# Поколения общих кэшей
+# =========================
+class CacheGeneration(Base):
+    """
+    Поколение кэша, общего по смыслу для всех процессов (поиск клиник).
+    Увеличивается при изменении данных; процессы сверяются с ним
+    и перестают читать записи старого поколения.
+    """
+
+    __tablename__ = "cache_generations"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    generation: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
 # =========================
 # Питомец
 # =========================
@@ -43,6 +100,10 @@ class Pet(Base):
     """
 
     __tablename__ = "pets"
+    __table_args__ = (
+        # Keyset-пагинация списка питомцев пользователя
+        Index("ix_pets_user_created", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
@@ -68,22 +129,31 @@ class Pet(Base):
         "Preference",
         back_populates="pet",
         cascade="all, delete-orphan",
+        lazy="raise",
         uselist=False,
     )
     habits = relationship(
         "Habit",
         back_populates="pet",
         cascade="all, delete-orphan",
+        lazy="raise",
     )
     health_records = relationship(
         "HealthRecord",
         back_populates="pet",
         cascade="all, delete-orphan",
+        lazy="raise",
+    )
+    due_dates = relationship(
+        "HealthDue",
+        cascade="all, delete-orphan",
+        lazy="raise",
     )
     events = relationship(
         "Event",
         back_populates="pet",
         cascade="all, delete-orphan",
+        lazy="raise",
     )
 
 
@@ -112,7 +182,7 @@ class Preference(Base):
     dislikes: Mapped[str | None] = mapped_column(Text, nullable=True)
     food_notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
-    pet = relationship("Pet", back_populates="preferences")
+    pet = relationship("Pet", back_populates="preferences", lazy="raise")
 
 
 # =========================
@@ -124,6 +194,9 @@ class Habit(Base):
     """
 
     __tablename__ = "habits"
+    __table_args__ = (
+        Index("ix_habits_pet_created", "pet_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
@@ -142,7 +215,7 @@ class Habit(Base):
         DateTime, default=datetime.utcnow
     )
 
-    pet = relationship("Pet", back_populates="habits")
+    pet = relationship("Pet", back_populates="habits", lazy="raise")
 
 
 # =========================
@@ -154,6 +227,11 @@ class HealthRecord(Base):
     """
 
     __tablename__ = "health_records"
+    __table_args__ = (
+        Index("ix_health_records_pet_created", "pet_id", "created_at", "id"),
+        # Последняя запись вида для пересчёта health_due
+        Index("ix_health_records_due", "pet_id", "due_kind", "performed_on"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
@@ -175,11 +253,38 @@ class HealthRecord(Base):
         String(20), nullable=True
     )
 
+    # Вид прививки / обработки и дата из record_date (health_due.track);
+    # NULL — запись не влияет на сроки
+    due_kind: Mapped[str | None] = mapped_column(String(30), nullable=True)
+    performed_on: Mapped[date | None] = mapped_column(Date, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow
     )
 
-    pet = relationship("Pet", back_populates="health_records")
+    pet = relationship("Pet", back_populates="health_records", lazy="raise")
+
+
+class HealthDue(Base):
+    """
+    Срок следующей прививки / обработки: одна строка на (питомец, вид).
+    Поддерживается ручками медкарты инкрементально (health_due.py).
+    """
+
+    __tablename__ = "health_due"
+    __table_args__ = (
+        # «Что скоро / просрочено» по всем питомцам пользователя
+        Index("ix_health_due_user_due", "user_id", "due_date"),
+    )
+
+    pet_id: Mapped[str] = mapped_column(ForeignKey("pets.id"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(30), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"))
+
+    # Запись, от которой отсчитан срок
+    record_id: Mapped[str] = mapped_column(String(36))
+    last_date: Mapped[date] = mapped_column(Date)
+    due_date: Mapped[date] = mapped_column(Date)
 
 
 # =========================
@@ -192,6 +297,14 @@ class Event(Base):
     """
 
     __tablename__ = "events"
+    __table_args__ = (
+        # Календарные окна: range scan по (pet_id, start_at)
+        Index("ix_events_pet_start", "pet_id", "start_at", "id"),
+        # Окно планировщика напоминаний (reminders.load_due)
+        Index("ix_events_reminders", "type", "status", "start_at"),
+        # Кандидаты в архив (archive.archive_batch)
+        Index("ix_events_status_start", "status", "start_at"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
@@ -208,9 +321,9 @@ class Event(Base):
     )  # feeding, walk, vet_visit, reminder
     title: Mapped[str] = mapped_column(String(200))
 
-    start_at: Mapped[str] = mapped_column(String(30))
-    end_at: Mapped[str | None] = mapped_column(
-        String(30), nullable=True
+    start_at: Mapped[datetime] = mapped_column(DateTime)
+    end_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
     )
 
     location: Mapped[str | None] = mapped_column(
@@ -222,22 +335,123 @@ class Event(Base):
         String(20), default="planned"
     )  # planned / done / cancelled
 
+    # Правило повторения (daily / weekly, interval, until, count, exdates).
+    # NULL — обычное разовое событие.
+    recurrence: Mapped[dict | None] = mapped_column(
+        JSON(none_as_null=True), nullable=True
+    )
+    # Начало последнего повторения; NULL у бесконечной серии
+    series_until: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
+
+    # Последнее выданное напоминание (повторение серии). Условный UPDATE
+    # этой колонки — «захват» напоминания одним воркером
+    reminded_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow
     )
 
-    pet = relationship("Pet", back_populates="events")
+    pet = relationship("Pet", back_populates="events", lazy="raise")
+    overrides = relationship(
+        "EventOverride",
+        back_populates="event",
+        cascade="all, delete-orphan",
+        lazy="raise",
+    )
+
+
+# =========================
+# Архив завершённых событий
+# =========================
+class EventArchive(Base):
+    """
+    Завершённые и отменённые разовые события старше archive_after_days
+    (archive.py). Колонки — как у events: строка переносится как есть
+    и при изменении события возвращается обратно.
+    """
+
+    __tablename__ = "events_archive"
+    __table_args__ = (
+        Index("ix_events_archive_pet_start", "pet_id", "start_at", "id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    pet_id: Mapped[str] = mapped_column(ForeignKey("pets.id"))
+
+    type: Mapped[str] = mapped_column(String(50))
+    title: Mapped[str] = mapped_column(String(200))
+
+    start_at: Mapped[datetime] = mapped_column(DateTime)
+    end_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    location: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(20))
+
+    recurrence: Mapped[dict | None] = mapped_column(
+        JSON(none_as_null=True), nullable=True
+    )
+    series_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    reminded_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# =========================
+# Исключения повторяющихся событий
+# =========================
+class EventOverride(Base):
+    """
+    Статус отдельного повторения серии (done / cancelled).
+    Хранится только для повторений, отличающихся от серии.
+    """
+
+    __tablename__ = "event_overrides"
+    __table_args__ = (
+        UniqueConstraint("event_id", "occurrence_at"),
+    )
+
+    id: Mapped[str] = mapped_column(
+        String(36),
+        primary_key=True,
+        default=lambda: str(uuid.uuid4()),
+    )
+    event_id: Mapped[str] = mapped_column(
+        ForeignKey("events.id"),
+        index=True,
+    )
+
+    occurrence_at: Mapped[datetime] = mapped_column(DateTime)
+    status: Mapped[str] = mapped_column(String(20))
+
+    event = relationship("Event", back_populates="overrides", lazy="raise")
 
 
 # =========================
 # Ветеринарные клиники
 # =========================
+def _clinic_key_default(context) -> str | None:
+    params = context.get_current_parameters()
+    return clinic_key(params.get("name"), params.get("lat"), params.get("lng"))
+
+
 class Clinic(Base):
     """
     Ветеринарные клиники (кэш поиска).
     """
 
     __tablename__ = "clinics"
+    __table_args__ = (
+        # Предфильтр геопоиска: bounding box по (lat, lng)
+        Index("ix_clinics_lat_lng", "lat", "lng"),
+        Index("ux_clinics_dedup_key", "dedup_key", unique=True),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
@@ -258,7 +472,18 @@ class Clinic(Base):
 
     source: Mapped[str | None] = mapped_column(
         String(50), nullable=True
-    )  # nominatim / manual
+    )  # nominatim / osm / csv / manual
+
+    # Импорт (clinic_import.py): ключ дедупликации и хэш содержимого,
+    # чтобы повторный импорт трогал только изменившиеся строки
+    dedup_key: Mapped[str | None] = mapped_column(
+        String(32),
+        nullable=True,
+        default=_clinic_key_default,
+    )
+    content_hash: Mapped[str | None] = mapped_column(
+        String(32), nullable=True
+    )
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow
@@ -0,0 +1,120 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import HTTPException, Query
+from sqlalchemy import DateTime, Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: str | None
+
+
+def page_params(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = Query(None, description="Opaque cursor from next_cursor"),
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor)
+
+
+# =========================
+# Cursor encoding
+# =========================
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_values(cursor: str, length: int) -> list:
+    """Значения курсора как есть (JSON), без приведения типов."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != length:
+            raise ValueError
+        return values
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_cursor(cursor: str, columns: tuple) -> list:
+    values = decode_values(cursor, len(columns))
+    try:
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(columns: tuple, values: list):
+    """
+    (a, b) > (x, y) в развёрнутом виде: a > x OR (a = x AND b > y).
+    Такую форму MySQL разворачивает в range scan по составному индексу.
+    """
+    head, *rest = columns
+    if not rest:
+        return head > values[0]
+    return or_(
+        head > values[0],
+        and_(head == values[0], _after(tuple(rest), values[1:])),
+    )
+
+
+# =========================
+# Keyset pagination
+# =========================
+
+async def fetch_after(
+    session: AsyncSession,
+    stmt: Select,
+    order_by: tuple,
+    page: PageParams,
+) -> list:
+    """Не более limit + 1 строк после курсора — этого хватает для has_more."""
+    if page.cursor:
+        stmt = stmt.where(_after(order_by, decode_cursor(page.cursor, order_by)))
+
+    result = await session.execute(
+        stmt.order_by(*order_by).limit(page.limit + 1)
+    )
+    return list(result.scalars())
+
+
+def make_page(items: list, order_by: tuple, limit: int) -> dict:
+    """items — отсортированные по order_by кандидаты (как минимум limit + 1)."""
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, col.key) for col in order_by])
+
+    return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select,
+    order_by: tuple,
+    page: PageParams,
+) -> dict:
+    """
+    Keyset-пагинация: стоимость страницы не зависит от её глубины.
+
+    order_by — уникальный в сумме набор колонок (последней должен идти id).
+    """
+    items = await fetch_after(session, stmt, order_by, page)
+    return make_page(items, order_by, page.limit)
@@ -0,0 +1,167 @@
+"""
+Удаление питомца со всей историей.
+
+Дочерние таблицы чистятся set-based DELETE по pet_id, строки в сессию
+не загружаются: число запросов не зависит от размера истории.
+
+Питомцев, у которых событий больше pet_delete_background_threshold,
+удаляет PetDeleter: события — пачками, каждая в своей короткой
+транзакции, питомец и остальные данные — последним шагом. До конца
+удаления питомец виден, его история постепенно пустеет. После
+перезапуска процесса незаконченное удаление не возобновляется —
+повторный DELETE продолжит с того, что осталось.
+"""
+import asyncio
+import contextvars
+import logging
+import uuid
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from access import forget_pet
+from changes import change_bus
+from config import settings
+from db import SessionLocal
+from models import (
+    Event,
+    EventArchive,
+    EventOverride,
+    Habit,
+    HealthDue,
+    HealthRecord,
+    Pet,
+    Preference,
+)
+from versions import bump_version
+
+log = logging.getLogger("petify.pet_deletion")
+
+# Дочерние таблицы с pet_id; event_overrides — через events
+PET_CHILDREN = (Event, EventArchive, HealthDue, HealthRecord, Habit, Preference)
+
+# Таблицы событий, которые в фоне чистятся пачками
+EVENT_TABLES = (Event, EventArchive)
+
+
+def _delete(model, *criteria):
+    # В сессии удаляемых строк нет — синхронизировать нечего
+    return (
+        delete(model)
+        .where(*criteria)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def purge_pet(session: AsyncSession, pet_id: str) -> None:
+    """Питомец и все его данные, без commit."""
+    event_ids = select(Event.id).where(Event.pet_id == pet_id)
+    await session.execute(_delete(EventOverride, EventOverride.event_id.in_(event_ids)))
+    for model in PET_CHILDREN:
+        await session.execute(_delete(model, model.pet_id == pet_id))
+    await session.execute(_delete(Pet, Pet.id == pet_id))
+
+
+async def count_events(session: AsyncSession, pet_id: str) -> int:
+    """События питомца в горячей таблице и архиве — одним запросом."""
+    hot, archived = (
+        select(func.count())
+        .select_from(model)
+        .where(model.pet_id == pet_id)
+        .scalar_subquery()
+        for model in EVENT_TABLES
+    )
+    return await session.scalar(select(hot + archived))
+
+
+async def purge_events_batch(
+    session: AsyncSession, model: type[Event | EventArchive], pet_id: str, limit: int
+) -> int:
+    """До limit событий питомца из model, без commit. Сколько удалено."""
+    # id отдельным запросом: MySQL не допускает LIMIT в подзапросе IN
+    event_ids = (
+        await session.scalars(select(model.id).where(model.pet_id == pet_id).limit(limit))
+    ).all()
+    if event_ids:
+        if model is Event:
+            await session.execute(
+                _delete(EventOverride, EventOverride.event_id.in_(event_ids))
+            )
+        await session.execute(_delete(model, model.id.in_(event_ids)))
+    return len(event_ids)
+
+
+class PetDeleter:
+    def __init__(self, session_factory: async_sessionmaker, batch_size: int, pause: float):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause = pause
+        self._tasks: dict[str, asyncio.Task] = {}
+
+        self.completed = 0
+        self.failed = 0
+        self.events_deleted = 0
+
+    def deleting(self, pet_id: str) -> bool:
+        return pet_id in self._tasks
+
+    def start(self, user_id: uuid.UUID, pet_id: str) -> None:
+        if pet_id in self._tasks:
+            return
+        # Свой контекст: запросы задачи не попадают в статистику
+        # и бюджет HTTP-запроса, который её запустил
+        task = asyncio.create_task(
+            self._run(user_id, pet_id), context=contextvars.Context()
+        )
+        self._tasks[pet_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(pet_id, None))
+
+    async def _run(self, user_id: uuid.UUID, pet_id: str) -> None:
+        try:
+            for model in EVENT_TABLES:
+                while True:
+                    async with self.session_factory() as session:
+                        deleted = await purge_events_batch(
+                            session, model, pet_id, self.batch_size
+                        )
+                        await bump_version(session, user_id)
+                        await session.commit()
+                    self.events_deleted += deleted
+                    if deleted < self.batch_size:
+                        break
+                    # Даём место обычным запросам между пачками
+                    await asyncio.sleep(self.pause)
+
+            async with self.session_factory() as session:
+                await purge_pet(session, pet_id)
+                await bump_version(session, user_id)
+                await session.commit()
+        except Exception:
+            self.failed += 1
+            log.exception("background delete of pet %s failed", pet_id)
+            return
+
+        self.completed += 1
+        forget_pet(pet_id)
+        await change_bus.publish(user_id, "pet", "deleted", pet_id, pet_id)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "events_deleted": self.events_deleted,
+        }
+
+
+pet_deleter = PetDeleter(
+    SessionLocal,
+    settings.pet_delete_batch_size,
+    settings.pet_delete_pause,
+)
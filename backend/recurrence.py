@@ -0,0 +1,231 @@
+import math
+from collections import defaultdict
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Event, EventOverride
+from schemas import EventRead, RecurrenceRule
+
+FREQ_STEPS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+# Максимальное окно, для которого разворачиваются серии
+MAX_WINDOW = timedelta(days=366)
+
+
+def _step(rule: RecurrenceRule) -> timedelta:
+    return FREQ_STEPS[rule.freq] * rule.interval
+
+
+def rule_of(event: Event) -> RecurrenceRule | None:
+    if not event.recurrence:
+        return None
+    return RecurrenceRule.model_validate(event.recurrence)
+
+
+def series_until(start_at: datetime, rule: RecurrenceRule) -> datetime | None:
+    """Начало последнего повторения серии (None — серия бесконечна)."""
+    if rule.count:
+        return start_at + _step(rule) * (rule.count - 1)
+    return rule.until
+
+
+def rule_columns(start_at: datetime, rule: RecurrenceRule | None) -> dict:
+    """Значения колонок recurrence / series_until для правила."""
+    if rule is None:
+        return {"recurrence": None, "series_until": None}
+    return {
+        "recurrence": rule.model_dump(mode="json", exclude_none=True),
+        "series_until": series_until(start_at, rule),
+    }
+
+
+def apply_rule(event: Event, rule: RecurrenceRule | None) -> None:
+    """Сохраняет правило в событии и пересчитывает series_until."""
+    for key, value in rule_columns(event.start_at, rule).items():
+        setattr(event, key, value)
+
+
+def occurrences(
+    start_at: datetime,
+    rule: RecurrenceRule,
+    window_start: datetime,
+    window_end: datetime,
+) -> Iterator[datetime]:
+    """
+    Повторения в окне [window_start, window_end).
+
+    Первое повторение окна вычисляется арифметически, поэтому стоимость
+    пропорциональна размеру окна, а не возрасту серии.
+    """
+    step = _step(rule)
+    last = series_until(start_at, rule)
+    exdates = set(rule.exdates)
+
+    k = max(0, math.ceil((window_start - start_at) / step))
+    at = start_at + step * k
+    while at < window_end and (last is None or at <= last):
+        if at not in exdates:
+            yield at
+        at += step
+
+
+def is_occurrence(event: Event, at: datetime) -> bool:
+    rule = rule_of(event)
+    if rule is None:
+        return False
+    return any(occurrences(event.start_at, rule, at, at + timedelta(seconds=1)))
+
+
+def expand_series(
+    series: list[Event],
+    overrides: dict[tuple[str, datetime], str],
+    window_start: datetime,
+    window_end: datetime,
+    per_series: int | None = None,
+) -> list[EventRead]:
+    """
+    Разворачивает серии в повторения окна.
+    overrides — статусы отдельных повторений по (event_id, occurrence_at);
+    per_series — не больше стольких первых повторений каждой серии.
+    """
+    items = []
+    for event in series:
+        rule = rule_of(event)
+        duration = event.end_at - event.start_at if event.end_at else None
+
+        dates = occurrences(event.start_at, rule, window_start, window_end)
+        for at in islice(dates, per_series):
+            items.append(
+                EventRead(
+                    id=event.id,
+                    pet_id=event.pet_id,
+                    type=event.type,
+                    title=event.title,
+                    start_at=at,
+                    end_at=at + duration if duration is not None else None,
+                    location=event.location,
+                    notes=event.notes,
+                    status=overrides.get((event.id, at), event.status),
+                    created_at=event.created_at,
+                    recurrence=rule,
+                    occurrence_at=at,
+                )
+            )
+    return items
+
+
+async def window_series(
+    session: AsyncSession,
+    stmt: Select,
+    window_start: datetime,
+    window_end: datetime,
+) -> tuple[list[Event], dict[tuple[str, datetime], str]]:
+    """
+    Серии из stmt (select(Event) с фильтрами), пересекающие окно,
+    и статусы их повторений в окне — для expand_series.
+    """
+    result = await session.execute(
+        stmt.where(
+            Event.recurrence.is_not(None),
+            Event.start_at < window_end,
+            or_(Event.series_until.is_(None), Event.series_until >= window_start),
+        )
+    )
+    series = result.scalars().all()
+
+    overrides = {}
+    if series:
+        result = await session.execute(
+            select(EventOverride).where(
+                EventOverride.event_id.in_([event.id for event in series]),
+                EventOverride.occurrence_at >= window_start,
+                EventOverride.occurrence_at < window_end,
+            )
+        )
+        overrides = {
+            (override.event_id, override.occurrence_at): override.status
+            for override in result.scalars()
+        }
+    return series, overrides
+
+
+async def upcoming_by_pet(
+    session: AsyncSession,
+    pet_ids: list[str],
+    limit: int,
+    now: datetime,
+) -> dict[str, list]:
+    """
+    Ближайшие запланированные события каждого питомца (не больше limit).
+
+    Фиксированное число запросов независимо от числа питомцев:
+    разовые события — одним запросом с ROW_NUMBER() по pet_id,
+    серии и их исключения — ещё двумя.
+    """
+    upcoming = defaultdict(list)
+    if not pet_ids or limit == 0:
+        return upcoming
+
+    row_number = (
+        func.row_number()
+        .over(partition_by=Event.pet_id, order_by=(Event.start_at, Event.id))
+        .label("row_number")
+    )
+    ranked = (
+        select(Event.id, row_number)
+        .where(
+            Event.pet_id.in_(pet_ids),
+            Event.recurrence.is_(None),
+            Event.status == "planned",
+            Event.start_at >= now,
+        )
+        .subquery()
+    )
+    result = await session.execute(
+        select(Event)
+        .join(ranked, Event.id == ranked.c.id)
+        .where(ranked.c.row_number <= limit)
+    )
+    for event in result.scalars():
+        upcoming[event.pet_id].append(event)
+
+    result = await session.execute(
+        select(Event).where(
+            Event.pet_id.in_(pet_ids),
+            Event.recurrence.is_not(None),
+            Event.status == "planned",
+            or_(Event.series_until.is_(None), Event.series_until >= now),
+        )
+    )
+    series = result.scalars().all()
+
+    if series:
+        result = await session.execute(
+            select(EventOverride).where(
+                EventOverride.event_id.in_([event.id for event in series]),
+                EventOverride.occurrence_at >= now,
+            )
+        )
+        overrides = {
+            (override.event_id, override.occurrence_at): override.status
+            for override in result.scalars()
+        }
+        # Запас на отменённые/выполненные повторения
+        per_series = limit + len(overrides)
+        for item in expand_series(
+            series, overrides, now, now + MAX_WINDOW, per_series
+        ):
+            if item.status == "planned":
+                upcoming[item.pet_id].append(item)
+
+    for pet_id, items in upcoming.items():
+        items.sort(key=lambda item: (item.start_at, item.id))
+        del items[limit:]
+    return upcoming
@@ -0,0 +1,116 @@
+"""
+Минимальный клиент протокола Redis (RESP) на asyncio — без зависимостей.
+Подходит любой совместимый сервер (Redis, Valkey, KeyDB).
+"""
+import asyncio
+from collections.abc import AsyncIterator
+from urllib.parse import urlparse
+
+
+class RedisError(Exception):
+    pass
+
+
+# Ошибки соединения, после которых клиент переподключается.
+# Таймаут (asyncio.TimeoutError) — подкласс OSError
+CONNECTION_ERRORS = (OSError, ConnectionError, asyncio.IncompleteReadError)
+
+
+class RedisClient:
+    """
+    Одно соединение для команд (выполняются по очереди) и отдельные —
+    для подписок (SUBSCRIBE занимает соединение целиком).
+
+    timeout ограничивает подключение и каждую команду вместе с ожиданием
+    очереди: медленный сервер даёт ошибку, а не зависший вызов.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._connection: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._lock = asyncio.Lock()
+
+    async def _open(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._send(reader, writer, "AUTH", self.password)
+            if self.db:
+                await self._send(reader, writer, "SELECT", self.db)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.wait_for(self._open(), self.timeout)
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _send(self, reader, writer, *args):
+        writer.write(self._encode(args))
+        await writer.drain()
+        return await self._read(reader)
+
+    async def _read(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            return None if size < 0 else (await reader.readexactly(size + 2))[:-2]
+        if kind == b"*":
+            size = int(body)
+            return None if size < 0 else [await self._read(reader) for _ in range(size)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def _command(self, *args):
+        async with self._lock:
+            try:
+                if self._connection is None:
+                    self._connection = await self._connect()
+                return await self._send(*self._connection, *args)
+            except (*CONNECTION_ERRORS, asyncio.CancelledError):
+                # Ответ мог остаться непрочитанным — переподключимся
+                # при следующей команде
+                await self.close()
+                raise
+
+    async def command(self, *args):
+        return await asyncio.wait_for(self._command(*args), self.timeout)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Сообщения канала; соединение закрывается вместе с генератором."""
+        reader, writer = await self._connect()
+        try:
+            writer.write(self._encode(("SUBSCRIBE", channel)))
+            await writer.drain()
+            while True:
+                reply = await self._read(reader)
+                if isinstance(reply, list) and reply[0] == b"message":
+                    yield reply[2]
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            self._connection[1].close()
+            self._connection = None
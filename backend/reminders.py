@@ -0,0 +1,402 @@
+"""
+Планировщик напоминаний: события type="reminder" в статусе planned.
+
+Каждый воркер держит в памяти min-heap напоминаний из окна
+[сейчас - grace, сейчас + lookahead), загруженного по индексу
+ix_events_reminders и перечитываемого раз в reminder_refresh секунд.
+Ручки событий обновляют кучу сразу после commit (schedule / forget / skip),
+поэтому нагрузка на БД пропорциональна числу срабатывающих напоминаний,
+а не размеру таблицы.
+
+Доставка — не больше одного раза на повторение, даже при нескольких
+воркерах: перед отправкой напоминание «забирается» условным UPDATE
+колонки events.reminded_at (последнее выданное повторение). Кто не
+обновил строку, тот напоминание не отправляет.
+"""
+import asyncio
+import heapq
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Protocol
+
+import httpx
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from db import SessionLocal
+from models import Event, EventOverride, Pet
+from recurrence import occurrences, rule_of
+
+log = logging.getLogger("petify.reminders")
+
+REMINDER = "reminder"
+
+
+@dataclass(frozen=True)
+class Reminder:
+    event_id: str
+    pet_id: str
+    user_id: str
+    title: str
+    notes: str | None
+    at: datetime  # начало события (повторения серии)
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "at": self.at.isoformat()}
+
+
+# =========================
+# Sinks
+# =========================
+
+class Sink(Protocol):
+    async def send(self, reminder: Reminder) -> None: ...
+
+
+class LogSink:
+    async def send(self, reminder: Reminder) -> None:
+        log.info(
+            "⏰ %s: %s (pet %s, user %s)",
+            reminder.at.isoformat(),
+            reminder.title,
+            reminder.pet_id,
+            reminder.user_id,
+        )
+
+
+class WebhookSink:
+    """POST JSON напоминания на URL. Без повторов: доставка at-most-once."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, reminder: Reminder) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json=reminder.as_dict())
+            response.raise_for_status()
+
+
+class MemorySink:
+    """Для тестов: отправленные напоминания копятся в sent."""
+
+    def __init__(self):
+        self.sent: list[Reminder] = []
+
+    async def send(self, reminder: Reminder) -> None:
+        self.sent.append(reminder)
+
+
+def make_sink(name: str) -> Sink:
+    if name == "webhook":
+        if not settings.reminder_webhook_url:
+            raise RuntimeError("REMINDER_WEBHOOK_URL is required for the webhook sink")
+        return WebhookSink(settings.reminder_webhook_url)
+    if name == "memory":
+        return MemorySink()
+    return LogSink()
+
+
+# =========================
+# Due reminders
+# =========================
+
+def due_times(event: Event, start: datetime, end: datetime) -> list[datetime]:
+    """Ещё не выданные напоминания события в окне [start, end)."""
+    if event.type != REMINDER or event.status != "planned":
+        return []
+
+    rule = rule_of(event)
+    if rule is None:
+        times = [event.start_at] if start <= event.start_at < end else []
+    else:
+        times = occurrences(event.start_at, rule, start, end)
+
+    after = event.reminded_at
+    return [at for at in times if after is None or at > after]
+
+
+async def load_due(
+    session: AsyncSession, start: datetime, end: datetime
+) -> list[Event]:
+    """Разовые напоминания окна и активные серии — по индексу (type, status, start_at)."""
+    base = select(Event).where(Event.type == REMINDER, Event.status == "planned")
+
+    singles = await session.scalars(
+        base.where(
+            Event.recurrence.is_(None),
+            Event.start_at >= start,
+            Event.start_at < end,
+        )
+    )
+    series = await session.scalars(
+        base.where(
+            Event.recurrence.is_not(None),
+            Event.start_at < end,
+            or_(Event.series_until.is_(None), Event.series_until >= start),
+        )
+    )
+    return [*singles, *series]
+
+
+async def claim(
+    session: AsyncSession, event_id: str, at: datetime
+) -> Reminder | None:
+    """
+    Забирает напоминание: перепроверяет событие (его могли изменить
+    в другом воркере) и сдвигает reminded_at условным UPDATE.
+    None — напоминание неактуально или его забрал другой воркер.
+    """
+    row = (
+        await session.execute(
+            select(Event, Pet.user_id).join(Pet).where(Event.id == event_id)
+        )
+    ).first()
+    if row is None:
+        return None
+
+    event, user_id = row
+    if at not in due_times(event, at, at + timedelta(seconds=1)):
+        return None
+
+    if event.recurrence is not None:
+        status = await session.scalar(
+            select(EventOverride.status).where(
+                EventOverride.event_id == event_id,
+                EventOverride.occurrence_at == at,
+            )
+        )
+        if status not in (None, "planned"):
+            return None
+
+    result = await session.execute(
+        update(Event)
+        .where(
+            Event.id == event_id,
+            or_(Event.reminded_at.is_(None), Event.reminded_at < at),
+        )
+        .values(reminded_at=at)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    if result.rowcount != 1:
+        return None
+
+    return Reminder(
+        event_id=event.id,
+        pet_id=event.pet_id,
+        user_id=str(user_id),
+        title=event.title,
+        notes=event.notes,
+        at=at,
+    )
+
+
+# =========================
+# Scheduler
+# =========================
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        sink: Sink,
+        lookahead: float,
+        refresh: float,
+        grace: float,
+        send_concurrency: int = 20,
+    ):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.lookahead = timedelta(seconds=lookahead)
+        self.refresh = refresh
+        self.grace = timedelta(seconds=grace)
+
+        # (время, event_id); актуальные записи — в _pending,
+        # остальные отбрасываются при извлечении
+        self._heap: list[tuple[datetime, str]] = []
+        self._pending: dict[str, set[datetime]] = {}
+        self.horizon: datetime | None = None
+
+        self._task: asyncio.Task | None = None
+        # Отправки идут отдельными задачами: медленный получатель
+        # не задерживает остальные напоминания того же тика
+        self._sending = asyncio.Semaphore(send_concurrency)
+        self._sends: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._reload = True
+        # Изменения, пришедшие во время загрузки окна: применяются поверх неё
+        self._replay: list[Event] | None = None
+
+        self.delivered = 0
+        self.skipped = 0
+        self.failed = 0
+
+    # ---- incremental updates (после commit в ручках событий) ----
+
+    def _push(self, event_id: str, at: datetime) -> None:
+        times = self._pending.setdefault(event_id, set())
+        if at not in times:
+            times.add(at)
+            heapq.heappush(self._heap, (at, event_id))
+
+    def schedule(self, event: Event) -> None:
+        """Событие создано или изменено: пересчитать его напоминания."""
+        if self._task is None:
+            return
+        if self._replay is not None:
+            self._replay.append(event)
+
+        self._pending.pop(event.id, None)
+        if self.horizon is not None:
+            start = datetime.utcnow() - self.grace
+            for at in due_times(event, start, self.horizon):
+                self._push(event.id, at)
+        self._wakeup.set()
+
+    def forget(self, event_id: str) -> None:
+        """Событие удалено."""
+        self._pending.pop(event_id, None)
+
+    def skip(self, event_id: str, at: datetime) -> None:
+        """Повторение серии выполнено или отменено."""
+        times = self._pending.get(event_id)
+        if times:
+            times.discard(at)
+
+    def reload(self) -> None:
+        """Перечитать окно из БД (например, после массовой вставки)."""
+        self._reload = True
+        self._wakeup.set()
+
+    # ---- loop ----
+
+    async def _load(self) -> None:
+        now = datetime.utcnow()
+        start, end = now - self.grace, now + self.lookahead
+
+        self._replay = []
+        try:
+            async with self.session_factory() as session:
+                events = await load_due(session, start, end)
+        finally:
+            replay, self._replay = self._replay, None
+
+        self._heap, self._pending = [], {}
+        self.horizon = end
+        for event in [*events, *replay]:
+            self._pending.pop(event.id, None)
+            for at in due_times(event, start, end):
+                self._push(event.id, at)
+
+    async def _claim(self, event_id: str, at: datetime) -> Reminder | None:
+        try:
+            async with self.session_factory() as session:
+                reminder = await claim(session, event_id, at)
+        except Exception:
+            log.exception("reminder claim failed: event %s at %s", event_id, at)
+            self.failed += 1
+            return None
+
+        if reminder is None:
+            self.skipped += 1
+        return reminder
+
+    async def _send(self, reminder: Reminder) -> None:
+        async with self._sending:
+            try:
+                await self.sink.send(reminder)
+            except Exception:
+                # Уже забрано: повторной отправки не будет
+                log.exception(
+                    "reminder not delivered: event %s at %s",
+                    reminder.event_id,
+                    reminder.at,
+                )
+                self.failed += 1
+            else:
+                self.delivered += 1
+
+    async def _fire_due(self) -> None:
+        while self._heap and self._heap[0][0] <= datetime.utcnow():
+            at, event_id = heapq.heappop(self._heap)
+            times = self._pending.get(event_id)
+            if not times or at not in times:
+                continue
+            times.discard(at)
+            if not times:
+                del self._pending[event_id]
+
+            # Забор — по одному (короткий UPDATE), отправка — в фоне
+            reminder = await self._claim(event_id, at)
+            if reminder is not None:
+                task = asyncio.create_task(self._send(reminder))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_reload = loop.time()
+        while True:
+            self._wakeup.clear()
+
+            if self._reload or loop.time() >= next_reload:
+                self._reload = False
+                try:
+                    await self._load()
+                    next_reload = loop.time() + self.refresh
+                except Exception:
+                    log.exception("reminder window reload failed")
+                    next_reload = loop.time() + min(self.refresh, 30.0)
+
+            await self._fire_due()
+
+            timeout = next_reload - loop.time()
+            if self._heap:
+                until_next = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                timeout = min(timeout, until_next)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._reload = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Забранные напоминания досылаются: повторно их никто не отправит.
+        # Ожидание ограничено таймаутом получателя
+        await asyncio.gather(*self._sends, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "pending": sum(len(times) for times in self._pending.values()),
+            "sending": len(self._sends),
+            "heap": len(self._heap),
+            "horizon": self.horizon,
+            "delivered": self.delivered,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+
+reminder_scheduler = ReminderScheduler(
+    SessionLocal,
+    make_sink(settings.reminder_sink),
+    settings.reminder_lookahead,
+    settings.reminder_refresh,
+    settings.reminder_grace,
+    settings.reminder_send_concurrency,
+)
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def fast_json(schema, content, headers: dict | None = None) -> Response:
+    """
+    Быстрый путь для больших списков: ORM-объекты валидируются в схему
+    один раз (from_attributes) и сериализуются в JSON внутри pydantic-core.
+
+    FastAPI не видит Response как данные, поэтому повторная валидация
+    по response_model и промежуточный dict не выполняются;
+    response_model в декораторе остаётся для OpenAPI.
+    """
+    adapter = _adapter(schema)
+    value = adapter.validate_python(content, from_attributes=True)
+    return Response(
+        adapter.dump_json(value), media_type="application/json", headers=headers
+    )
@@ -0,0 +1,98 @@
+import csv
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import current_superuser, user_cache
+from access import pet_owners
+from archive import event_archiver, table_sizes
+from changes import change_bus
+from clinic_cache import clinic_cache
+from clinic_import import (
+    BATCH_SIZE,
+    FORMATS,
+    detect_format,
+    import_clinics,
+    read_records,
+    text_stream,
+)
+from db import SessionLocal, engine, get_session, pool_stats, replica_engine
+from pet_deletion import pet_deleter
+from reminders import reminder_scheduler
+from telemetry import query_budget
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/cache")
+@query_budget(1)
+async def cache_stats(user=Depends(current_superuser)):
+    return {
+        "users": user_cache.stats(),
+        "pet_owners": pet_owners.stats(),
+        "clinic_search": clinic_cache.stats(),
+    }
+
+
+@router.get("/db")
+@query_budget(1)
+async def db_stats(user=Depends(current_superuser)):
+    return {
+        "primary": pool_stats(engine),
+        "replica": pool_stats(replica_engine) if replica_engine is not None else None,
+    }
+
+
+@router.get("/reminders")
+@query_budget(1)
+async def reminder_stats(user=Depends(current_superuser)):
+    return reminder_scheduler.stats()
+
+
+@router.get("/changes")
+@query_budget(1)
+async def change_stream_stats(user=Depends(current_superuser)):
+    return change_bus.stats()
+
+
+@router.get("/deletions")
+@query_budget(1)
+async def pet_deletion_stats(user=Depends(current_superuser)):
+    return pet_deleter.stats()
+
+
+@router.get("/archive")
+@query_budget(4)
+async def archive_stats(
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_superuser),
+):
+    """Размеры горячей таблицы событий и архива, состояние архиватора."""
+    return {**await table_sizes(session), "archiver": event_archiver.stats()}
+
+
+@router.post("/clinics/import")
+@query_budget(None, allow_repeats=True)
+async def import_clinics_upload(
+    file: UploadFile = File(...),
+    format: str | None = Query(None, pattern="^(" + "|".join(FORMATS) + ")$"),
+    source: str | None = Query(None, max_length=50),
+    batch_size: int = Query(BATCH_SIZE, ge=1, le=10_000),
+    user=Depends(current_superuser),
+):
+    """
+    Импорт выгрузки OSM / Nominatim (JSON, JSON Lines, CSV, можно gzip).
+    Повторный импорт обновляет только изменившиеся клиники.
+    """
+    fmt = format or detect_format(file.filename or "")
+    try:
+        stats = await import_clinics(
+            SessionLocal,
+            read_records(text_stream(file.file), fmt),
+            source or ("csv" if fmt == "csv" else "nominatim"),
+            batch_size,
+        )
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        # Пачки до ошибки уже сохранены; повторный импорт их не тронет
+        raise HTTPException(status_code=400, detail=f"Invalid extract: {exc}")
+    return stats.as_dict()
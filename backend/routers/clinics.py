@@ -1,29 +1,47 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
+from clinic_cache import clinic_cache
 from db import get_session
+from geo import CLINIC_FIELDS, nearest_rows
+from responses import fast_json
 from models import Clinic
 from schemas import ClinicRead, ClinicSearchResponse
 from auth import current_user
+from telemetry import query_budget
 
 router = APIRouter(prefix="/clinics", tags=["Clinics"])
 
+MAX_RADIUS_M = 100_000
+
 
 @router.get("/search", response_model=ClinicSearchResponse)
+@query_budget(3)
 async def search_clinics(
-    lat: float,
-    lng: float,
-    radius: int,
+    lat: float = Query(ge=-90, le=90),
+    lng: float = Query(ge=-180, le=180),
+    radius: int = Query(gt=0, le=MAX_RADIUS_M, description="Radius in meters"),
+    limit: int = Query(50, ge=1, le=500, description="K nearest clinics"),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    result = await session.execute(select(Clinic))
-    clinics = result.scalars().all()
-    return {"items": clinics}
+    """
+    K ближайших клиник в радиусе. Кандидаты берутся из кэша тайлов
+    (clinic_cache), точный фильтр по расстоянию — на каждый запрос.
+    Третий запрос — сверка поколения кэша с БД, не чаще раза в несколько секунд.
+    """
+    rows = await clinic_cache.rows(session, lat, lng, radius)
+
+    items = []
+    for row, distance in nearest_rows(rows, lat, lng, radius, limit):
+        item = dict(zip(CLINIC_FIELDS, row))
+        item["distance_m"] = round(distance, 1)
+        items.append(item)
+    return fast_json(ClinicSearchResponse, {"items": items})
 
 
 @router.get("/{clinic_id}", response_model=ClinicRead)
+@query_budget(2)
 async def get_clinic(
     clinic_id: str,
     session: AsyncSession = Depends(get_session),
@@ -1,117 +1,462 @@
-from fastapi import APIRouter, Depends, HTTPException
+import heapq
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Select, select
 
 from db import get_session
-from models import Event, Pet
-from schemas import EventCreate, EventUpdate, EventRead
+from models import Event, EventArchive, EventOverride, Pet
+from schemas import (
+    Page,
+    EventCreate,
+    EventUpdate,
+    EventRead,
+    EventOccurrenceUpdate,
+    EventSummary,
+    BulkCreate,
+    BulkCreateResult,
+    BulkItemError,
+)
 from auth import current_user
+from changes import change_bus, sse_stream
+from config import settings
+from versions import Conditional, bump_version, conditional_get
+from access import ensure_pet_access, owned_pet_ids, pet_writes
+from archive import get_owned_any, get_owned_event, reaches_archive
+from bulk import insert_rows, validate_items
+from responses import fast_json
+from helpers import naive_utc
+from pagination import (
+    PageParams,
+    decode_cursor,
+    fetch_after,
+    make_page,
+    page_params,
+)
+from recurrence import (
+    MAX_WINDOW,
+    apply_rule,
+    expand_series,
+    is_occurrence,
+    rule_columns,
+    rule_of,
+    window_series,
+)
+from reminders import reminder_scheduler
+from summary import summarize
+from telemetry import query_budget
 
 router = APIRouter(prefix="/events", tags=["Events"])
 
+ORDER_BY = (Event.start_at, Event.id)
+ARCHIVE_ORDER_BY = (EventArchive.start_at, EventArchive.id)
+
+
+def _sort_key(item) -> tuple:
+    return (item.start_at, item.id)
+
+
+def _user_events(
+    model: type[Event | EventArchive],
+    user_id: uuid.UUID,
+    pet_id: str | None,
+    type_: str | None,
+) -> Select:
+    stmt = select(model).join(Pet).where(Pet.user_id == user_id)
+    if pet_id:
+        stmt = stmt.where(model.pet_id == pet_id)
+    if type_:
+        stmt = stmt.where(model.type == type_)
+    return stmt
+
+
+def _in_range(
+    stmt: Select,
+    model: type[Event | EventArchive],
+    start: datetime | None,
+    end: datetime | None,
+    status: str | None,
+) -> Select:
+    if start:
+        stmt = stmt.where(model.start_at >= start)
+    if end:
+        stmt = stmt.where(model.start_at < end)
+    if status:
+        stmt = stmt.where(model.status == status)
+    return stmt
+
+
+async def _with_archive(
+    session: AsyncSession,
+    items: list,
+    archive: Select | None,
+    page: PageParams,
+) -> list:
+    """Слить страницу горячей таблицы со страницей архива (тот же курсор)."""
+    if archive is None:
+        return items
+    archived = await fetch_after(session, archive, ARCHIVE_ORDER_BY, page)
+    return list(islice(heapq.merge(items, archived, key=_sort_key), page.limit + 1))
 
-@router.get("", response_model=list[EventRead])
+
+async def _window_page(
+    session: AsyncSession,
+    stmt: Select,
+    archive: Select | None,
+    window_start: datetime,
+    window_end: datetime,
+    status: str | None,
+    page: PageParams,
+) -> dict:
+    """
+    Страница окна: разовые события из БД (и архива, если окно до него
+    дотягивается) + повторения серий, развёрнутые только для этого окна,
+    слитые в один keyset-поток.
+    """
+    singles_stmt = _in_range(
+        stmt.where(Event.recurrence.is_(None)), Event, window_start, window_end, status
+    )
+    singles = await fetch_after(session, singles_stmt, ORDER_BY, page)
+    if archive is not None:
+        archive = _in_range(archive, EventArchive, window_start, window_end, status)
+    singles = await _with_archive(session, singles, archive, page)
+
+    series, overrides = await window_series(
+        session, stmt, window_start, window_end
+    )
+    occurrences = expand_series(series, overrides, window_start, window_end)
+    if status:
+        occurrences = [item for item in occurrences if item.status == status]
+    if page.cursor:
+        after = tuple(decode_cursor(page.cursor, ORDER_BY))
+        occurrences = [
+            item for item in occurrences if (item.start_at, item.id) > after
+        ]
+    occurrences.sort(key=_sort_key)
+
+    merged = heapq.merge(singles, occurrences, key=_sort_key)
+    return make_page(list(islice(merged, page.limit + 1)), ORDER_BY, page.limit)
+
+
+async def _set_occurrence_status(
+    session: AsyncSession,
+    event: Event,
+    occurrence_at: datetime,
+    status: str,
+    user_id: uuid.UUID,
+) -> EventRead:
+    if not is_occurrence(event, occurrence_at):
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+
+    result = await session.execute(
+        select(EventOverride).where(
+            EventOverride.event_id == event.id,
+            EventOverride.occurrence_at == occurrence_at,
+        )
+    )
+    override = result.scalar_one_or_none()
+
+    # Храним только отличия от серии
+    if status == event.status:
+        if override:
+            await session.delete(override)
+    elif override:
+        override.status = status
+    else:
+        session.add(
+            EventOverride(
+                event_id=event.id,
+                occurrence_at=occurrence_at,
+                status=status,
+            )
+        )
+    await bump_version(session, user_id)
+    await session.commit()
+
+    if status == "planned":
+        reminder_scheduler.schedule(event)
+    else:
+        reminder_scheduler.skip(event.id, occurrence_at)
+    await change_bus.publish(
+        user_id,
+        "event",
+        "completed" if status == "done" else "updated",
+        event.id,
+        event.pet_id,
+    )
+
+    return expand_series(
+        [event],
+        {(event.id, occurrence_at): status},
+        occurrence_at,
+        occurrence_at + timedelta(seconds=1),
+    )[0]
+
+
+@router.get("", response_model=Page[EventRead])
+@query_budget(6)
 async def list_events(
+    from_: datetime | None = Query(None, alias="from"),
+    to: datetime | None = None,
+    pet_id: str | None = None,
+    type: str | None = None,
+    status: str | None = None,
+    page: PageParams = Depends(page_params),
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    result = await session.execute(
-        select(Event).join(Pet).where(Pet.user_id == user.id)
+    """
+    События пользователя, начинающиеся в окне [from, to).
+
+    Если заданы обе границы, повторяющиеся серии разворачиваются
+    в отдельные повторения окна; иначе серии отдаются как есть.
+    Архив завершённых событий читается, только если выборка
+    начинается раньше его порога.
+    """
+    cond.check()
+    window_start = naive_utc(from_) if from_ else None
+    window_end = naive_utc(to) if to else None
+
+    stmt = _user_events(Event, user.id, pet_id, type)
+    archive = (
+        _user_events(EventArchive, user.id, pet_id, type)
+        if reaches_archive(window_start, status)
+        else None
+    )
+
+    if window_start and window_end:
+        if window_end - window_start > MAX_WINDOW:
+            raise HTTPException(status_code=400, detail="Window is too large")
+        return fast_json(
+            Page[EventRead],
+            await _window_page(
+                session, stmt, archive, window_start, window_end, status, page
+            ),
+            headers=cond.headers,
+        )
+
+    items = await fetch_after(
+        session, _in_range(stmt, Event, window_start, window_end, status), ORDER_BY, page
+    )
+    if archive is not None:
+        archive = _in_range(archive, EventArchive, window_start, window_end, status)
+    items = await _with_archive(session, items, archive, page)
+
+    return fast_json(
+        Page[EventRead],
+        make_page(items, ORDER_BY, page.limit),
+        headers=cond.headers,
     )
-    return result.scalars().all()
 
 
 @router.post("", response_model=EventRead)
+@query_budget(4)
 async def create_event(
     data: EventCreate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, data.pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    await ensure_pet_access(session, data.pet_id, user.id)
 
-    event = Event(**data.model_dump())
-    session.add(event)
-    await session.commit()
-    await session.refresh(event)
+    event = Event(**data.model_dump(exclude={"recurrence"}))
+    apply_rule(event, data.recurrence)
+    async with pet_writes(session, event.pet_id):
+        session.add(event)
+        await bump_version(session, user.id)
+        await session.commit()
+    reminder_scheduler.schedule(event)
+    await change_bus.publish(user.id, "event", "created", event.id, event.pet_id)
     return event
 
 
+@router.post("/bulk", response_model=BulkCreateResult)
+@query_budget(4)
+async def create_events_bulk(
+    data: BulkCreate,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    """
+    Импорт событий: владение проверяется один раз на питомца,
+    вставка — одним executemany.
+    """
+    valid, errors = validate_items(EventCreate, data.items)
+    owned = await owned_pet_ids(
+        session, {item.pet_id for _, item in valid}, user.id
+    )
+
+    rows = []
+    for index, item in valid:
+        if item.pet_id not in owned:
+            errors.append(BulkItemError(index=index, detail="Pet not found"))
+            continue
+        rows.append(
+            {
+                **item.model_dump(exclude={"recurrence"}),
+                **rule_columns(item.start_at, item.recurrence),
+            }
+        )
+
+    async with pet_writes(session, *owned):
+        await bump_version(session, user.id)
+        result = await insert_rows(session, Event, rows, errors, data.atomic)
+    if any(row["type"] == "reminder" for row in rows):
+        reminder_scheduler.reload()
+    for row in rows:
+        await change_bus.publish(user.id, "event", "created", row["id"], row["pet_id"])
+    return result
+
+
+@router.get("/summary", response_model=EventSummary)
+@query_budget(6)
+async def events_summary(
+    from_: datetime = Query(alias="from"),
+    to: datetime = Query(),
+    group_by: Literal["day", "week"] = "day",
+    pet_id: str | None = None,
+    cond: Conditional = Depends(conditional_get),
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    """
+    Счётчики событий окна [from, to) по дням или неделям, типам
+    и статусам — для месячного вида календаря.
+    """
+    window_start, window_end = naive_utc(from_), naive_utc(to)
+    if window_end <= window_start:
+        raise HTTPException(status_code=400, detail="Empty window")
+    if window_end - window_start > MAX_WINDOW:
+        raise HTTPException(status_code=400, detail="Window is too large")
+
+    cond.check()
+    return fast_json(
+        EventSummary,
+        await summarize(
+            session, user.id, window_start, window_end, group_by, pet_id
+        ),
+        headers=cond.headers,
+    )
+
+
+@router.get("/stream", response_class=StreamingResponse)
+@query_budget(2)
+async def stream_changes(
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    """
+    Server-Sent Events: created / updated / completed / deleted для
+    питомцев, событий, привычек, предпочтений и медкарты пользователя.
+    Событие resync — клиент отстал, данные нужно перечитать.
+    """
+    # Сессия нужна только current_user; поток живёт долго —
+    # соединение возвращается в пул до начала стрима
+    await session.close()
+    return StreamingResponse(
+        sse_stream(user.id, settings.change_stream_heartbeat),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{event_id}", response_model=EventRead)
+@query_budget(4)
 async def get_event(
     event_id: str,
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    event = await session.get(Event, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-
-    pet = await session.get(Pet, event.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
+    # Архив — только если в горячей таблице события нет
+    event = await get_owned_any(session, event_id, user.id)
+    cond.check()
     return event
 
 
 @router.put("/{event_id}", response_model=EventRead)
+@query_budget(7)
 async def update_event(
     event_id: str,
     data: EventUpdate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    event = await session.get(Event, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-
-    pet = await session.get(Pet, event.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    event = await get_owned_event(session, event_id, user.id)
 
-    for key, value in data.model_dump(exclude_unset=True).items():
+    fields = data.model_dump(exclude_unset=True, exclude={"recurrence"})
+    for key, value in fields.items():
         setattr(event, key, value)
 
+    if "recurrence" in data.model_fields_set:
+        apply_rule(event, data.recurrence)
+    elif "start_at" in fields:
+        apply_rule(event, rule_of(event))
+
+    await bump_version(session, user.id)
     await session.commit()
-    await session.refresh(event)
+    reminder_scheduler.schedule(event)
+    await change_bus.publish(user.id, "event", "updated", event.id, event.pet_id)
     return event
 
 
 @router.delete("/{event_id}")
+@query_budget(6)
 async def delete_event(
     event_id: str,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    event = await session.get(Event, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-
-    pet = await session.get(Pet, event.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    event = await get_owned_any(session, event_id, user.id)
 
     await session.delete(event)
+    await bump_version(session, user.id)
     await session.commit()
+    reminder_scheduler.forget(event_id)
+    await change_bus.publish(user.id, "event", "deleted", event_id, event.pet_id)
     return {"status": "deleted"}
 
 
 @router.patch("/{event_id}/complete", response_model=EventRead)
+@query_budget(7)
 async def complete_event(
     event_id: str,
+    occurrence_at: datetime | None = Query(
+        None, description="Complete a single occurrence of a series"
+    ),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    event = await session.get(Event, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
+    event = await get_owned_event(session, event_id, user.id)
 
-    pet = await session.get(Pet, event.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    if occurrence_at:
+        return await _set_occurrence_status(
+            session, event, naive_utc(occurrence_at), "done", user.id
+        )
 
     event.status = "done"
+    await bump_version(session, user.id)
     await session.commit()
-    await session.refresh(event)
+    reminder_scheduler.schedule(event)
+    await change_bus.publish(user.id, "event", "completed", event.id, event.pet_id)
     return event
+
+
+@router.put("/{event_id}/occurrences", response_model=EventRead)
+@query_budget(5)
+async def update_occurrence(
+    event_id: str,
+    data: EventOccurrenceUpdate,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    event = await get_owned_event(session, event_id, user.id)
+
+    return await _set_occurrence_status(
+        session, event, data.occurrence_at, data.status, user.id
+    )
@@ -1,63 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from db import get_session
-from models import Habit, Pet
-from schemas import HabitCreate, HabitRead
+from models import Habit
+from schemas import Page, HabitCreate, HabitRead, BulkCreate, BulkCreateResult
 from auth import current_user
+from changes import change_bus
+from versions import Conditional, bump_version, conditional_get
+from access import ensure_pet_access, get_owned, pet_writes
+from bulk import insert_rows, validate_items
+from responses import fast_json
+from pagination import PageParams, page_params, paginate
+from telemetry import query_budget
 
 router = APIRouter(tags=["Habits"])
 
 
-@router.get("/pets/{pet_id}/habits", response_model=list[HabitRead])
+@router.get("/pets/{pet_id}/habits", response_model=Page[HabitRead])
+@query_budget(4)
 async def list_habits(
     pet_id: str,
+    page: PageParams = Depends(page_params),
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    await ensure_pet_access(session, pet_id, user.id)
+    cond.check()
 
-    result = await session.execute(
-        select(Habit).where(Habit.pet_id == pet_id)
+    return fast_json(
+        Page[HabitRead],
+        await paginate(
+            session,
+            select(Habit).where(Habit.pet_id == pet_id),
+            (Habit.created_at, Habit.id),
+            page,
+        ),
+        headers=cond.headers,
     )
-    return result.scalars().all()
 
 
 @router.post("/pets/{pet_id}/habits", response_model=HabitRead)
+@query_budget(4)
 async def create_habit(
     pet_id: str,
     data: HabitCreate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    await ensure_pet_access(session, pet_id, user.id)
 
     habit = Habit(pet_id=pet_id, **data.model_dump())
-    session.add(habit)
-    await session.commit()
-    await session.refresh(habit)
+    async with pet_writes(session, pet_id):
+        session.add(habit)
+        await bump_version(session, user.id)
+        await session.commit()
+    await change_bus.publish(user.id, "habit", "created", habit.id, pet_id)
     return habit
 
 
+@router.post("/pets/{pet_id}/habits/bulk", response_model=BulkCreateResult)
+@query_budget(4)
+async def create_habits_bulk(
+    pet_id: str,
+    data: BulkCreate,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    await ensure_pet_access(session, pet_id, user.id)
+
+    valid, errors = validate_items(HabitCreate, data.items)
+    rows = [{"pet_id": pet_id, **item.model_dump()} for _, item in valid]
+    async with pet_writes(session, pet_id):
+        await bump_version(session, user.id)
+        result = await insert_rows(session, Habit, rows, errors, data.atomic)
+    for habit_id in result.created:
+        await change_bus.publish(user.id, "habit", "created", habit_id, pet_id)
+    return result
+
+
 @router.delete("/habits/{habit_id}")
+@query_budget(4)
 async def delete_habit(
     habit_id: str,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    habit = await session.get(Habit, habit_id)
-    if not habit:
-        raise HTTPException(status_code=404, detail="Habit not found")
-
-    pet = await session.get(Pet, habit.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    habit = await get_owned(session, Habit, habit_id, user.id, "Habit")
 
     await session.delete(habit)
+    await bump_version(session, user.id)
     await session.commit()
+    await change_bus.publish(user.id, "habit", "deleted", habit_id, habit.pet_id)
     return {"status": "deleted"}
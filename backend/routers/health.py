@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+
+from db import engine
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready(request: Request):
+    """
+    503, пока не завершён старт: схема проверена, пул прогрет.
+    """
+    if not request.app.state.ready:
+        return ORJSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready", "pool": engine.pool.status()}
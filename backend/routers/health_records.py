@@ -1,86 +1,218 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from db import get_session
-from models import HealthRecord, Pet
-from schemas import HealthRecordCreate, HealthRecordUpdate, HealthRecordRead
+from models import HealthDue, HealthRecord, Pet
+from schemas import (
+    Page,
+    HealthRecordCreate,
+    HealthRecordUpdate,
+    HealthRecordRead,
+    BulkCreate,
+    BulkCreateResult,
+    DueRead,
+)
 from auth import current_user
+from changes import change_bus
+from versions import Conditional, bump_version, conditional_get
+from access import ensure_pet_access, get_owned, get_owned_pet, pet_writes
+from bulk import insert_rows, validate_items
+from health_due import (
+    due_item,
+    record_added,
+    record_changed,
+    record_removed,
+    rows_added,
+    track,
+)
+from responses import fast_json
+from pagination import PageParams, page_params, paginate
+from telemetry import query_budget
 
 router = APIRouter(tags=["Health Records"])
 
 
-@router.get("/pets/{pet_id}/health-records", response_model=list[HealthRecordRead])
+@router.get("/pets/{pet_id}/health-records", response_model=Page[HealthRecordRead])
+@query_budget(4)
 async def list_records(
     pet_id: str,
+    page: PageParams = Depends(page_params),
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
-
-    result = await session.execute(
-        select(HealthRecord).where(HealthRecord.pet_id == pet_id)
+    await ensure_pet_access(session, pet_id, user.id)
+    cond.check()
+
+    return fast_json(
+        Page[HealthRecordRead],
+        await paginate(
+            session,
+            select(HealthRecord).where(HealthRecord.pet_id == pet_id),
+            (HealthRecord.created_at, HealthRecord.id),
+            page,
+        ),
+        headers=cond.headers,
     )
-    return result.scalars().all()
 
 
 @router.post("/pets/{pet_id}/health-records", response_model=HealthRecordRead)
+@query_budget(6)
 async def create_record(
     pet_id: str,
     data: HealthRecordCreate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
-
     record = HealthRecord(pet_id=pet_id, **data.model_dump())
-    session.add(record)
-    await session.commit()
-    await session.refresh(record)
+    track(record)
+
+    async with pet_writes(session, pet_id):
+        if record.due_kind is None:
+            await ensure_pet_access(session, pet_id, user.id)
+            session.add(record)
+        else:
+            # Интервал зависит от вида животного — питомец нужен целиком
+            pet = await get_owned_pet(session, pet_id, user.id)
+            session.add(record)
+            await record_added(session, pet, record)
+
+        await bump_version(session, user.id)
+        await session.commit()
+    await change_bus.publish(user.id, "health_record", "created", record.id, pet_id)
     return record
 
 
+@router.post(
+    "/pets/{pet_id}/health-records/bulk", response_model=BulkCreateResult
+)
+@query_budget(8)
+async def create_records_bulk(
+    pet_id: str,
+    data: BulkCreate,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    valid, errors = validate_items(HealthRecordCreate, data.items)
+    rows = [{"pet_id": pet_id, **item.model_dump()} for _, item in valid]
+    pet = await get_owned_pet(session, pet_id, user.id)
+
+    async def after_insert(inserted: list[dict]) -> None:
+        await rows_added(session, pet, inserted)
+
+    async with pet_writes(session, pet_id):
+        await bump_version(session, user.id)
+        result = await insert_rows(
+            session, HealthRecord, rows, errors, data.atomic, after_insert
+        )
+    for record_id in result.created:
+        await change_bus.publish(user.id, "health_record", "created", record_id, pet_id)
+    return result
+
+
 @router.put("/health-records/{record_id}", response_model=HealthRecordRead)
+@query_budget(10)
 async def update_record(
     record_id: str,
     data: HealthRecordUpdate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    record = await session.get(HealthRecord, record_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Record not found")
-
-    pet = await session.get(Pet, record.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    record = await get_owned(session, HealthRecord, record_id, user.id, "Record")
+    old_kind, old_date = record.due_kind, record.performed_on
 
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(record, key, value)
 
+    track(record)
+    if (old_kind, old_date) != (record.due_kind, record.performed_on):
+        pet = await session.get(Pet, record.pet_id)
+        await record_changed(session, pet, record, old_kind, old_date)
+
+    await bump_version(session, user.id)
     await session.commit()
-    await session.refresh(record)
+    await change_bus.publish(
+        user.id, "health_record", "updated", record.id, record.pet_id
+    )
     return record
 
 
 @router.delete("/health-records/{record_id}")
+@query_budget(8)
 async def delete_record(
     record_id: str,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    record = await session.get(HealthRecord, record_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Record not found")
+    record = await get_owned(session, HealthRecord, record_id, user.id, "Record")
 
-    pet = await session.get(Pet, record.pet_id)
-    if pet.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    if record.due_kind is not None:
+        pet = await session.get(Pet, record.pet_id)
+        await record_removed(session, pet, record.due_kind, record.id)
 
     await session.delete(record)
+    await bump_version(session, user.id)
     await session.commit()
+    await change_bus.publish(
+        user.id, "health_record", "deleted", record_id, record.pet_id
+    )
     return {"status": "deleted"}
+
+
+# =========================
+# Сроки прививок и обработок
+# =========================
+
+@router.get("/pets/{pet_id}/due", response_model=list[DueRead])
+@query_budget(3)
+async def pet_due(
+    pet_id: str,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    # Без ETag: days_left и overdue меняются со сменой даты
+    await ensure_pet_access(session, pet_id, user.id)
+
+    result = await session.scalars(
+        select(HealthDue)
+        .where(HealthDue.pet_id == pet_id)
+        .order_by(HealthDue.due_date, HealthDue.kind)
+    )
+    today = datetime.utcnow().date()
+    return fast_json(
+        list[DueRead],
+        [due_item(due, today) for due in result],
+    )
+
+
+@router.get("/health/due", response_model=list[DueRead])
+@query_budget(2)
+async def upcoming_due(
+    within: str = Query(
+        "30d",
+        pattern=r"^\d{1,4}[dw]?$",
+        description="Горизонт: 30d, 8w или число дней; просроченные входят всегда",
+    ),
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    days = int(within.rstrip("dw")) * (7 if within.endswith("w") else 1)
+    today = datetime.utcnow().date()
+
+    # Range scan по ix_health_due_user_due
+    result = await session.execute(
+        select(HealthDue, Pet.name)
+        .join(Pet, Pet.id == HealthDue.pet_id)
+        .where(
+            HealthDue.user_id == user.id,
+            HealthDue.due_date <= today + timedelta(days=days),
+        )
+        .order_by(HealthDue.due_date, HealthDue.pet_id, HealthDue.kind)
+    )
+    return fast_json(
+        list[DueRead],
+        [due_item(due, today, pet_name) for due, pet_name in result],
+    )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from access import pet_owners
+from auth import user_cache
+from clinic_cache import clinic_cache
+from db import engine, replica_engine
+from telemetry import render
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus."""
+    engines = {"primary": engine}
+    if replica_engine is not None:
+        engines["replica"] = replica_engine
+
+    return PlainTextResponse(
+        render(
+            engines,
+            {
+                "users": user_cache,
+                "pet_owners": pet_owners,
+                "clinic_search": clinic_cache,
+            },
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,27 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
 from db import get_session
 from models import Pet
-from schemas import PetCreate, PetUpdate, PetRead
+from schemas import Page, PetCreate, PetUpdate, PetRead, PetOverview
 from auth import current_user
+from changes import change_bus
+from versions import Conditional, bump_version, conditional_get
+from access import ensure_pet_access, forget_pet, get_owned_pet
+from config import settings
+from health_due import species_changed
+from pet_deletion import count_events, pet_deleter, purge_pet
+from pagination import PageParams, fetch_after, make_page, page_params, paginate
+from recurrence import upcoming_by_pet
+from responses import fast_json
+from telemetry import query_budget
 
 router = APIRouter(prefix="/pets", tags=["Pets"])
 
+OVERVIEW_OPTIONS = (
+    selectinload(Pet.preferences),
+    selectinload(Pet.habits),
+    selectinload(Pet.health_records),
+)
+
+
+async def _overviews(
+    session: AsyncSession, pets: list[Pet], upcoming: int
+) -> list[PetOverview]:
+    events = await upcoming_by_pet(
+        session, [pet.id for pet in pets], upcoming, datetime.utcnow()
+    )
+
+    items = []
+    for pet in pets:
+        item = PetOverview.model_validate(pet)
+        item.upcoming_events = events.get(pet.id, [])
+        items.append(item)
+    return items
+
 
-@router.get("", response_model=list[PetRead])
+@router.get("", response_model=Page[PetRead])
+@query_budget(3)
 async def list_pets(
+    page: PageParams = Depends(page_params),
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    result = await session.execute(
-        select(Pet).where(Pet.user_id == user.id)
+    cond.check()
+    return fast_json(
+        Page[PetRead],
+        await paginate(
+            session,
+            select(Pet).where(Pet.user_id == user.id),
+            (Pet.created_at, Pet.id),
+            page,
+        ),
+        headers=cond.headers,
     )
-    return result.scalars().all()
+
+
+@router.get("/overview", response_model=Page[PetOverview])
+@query_budget(8)
+async def list_overviews(
+    upcoming: int = Query(5, ge=0, le=50),
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    """
+    Сводки по всем питомцам пользователя за фиксированное число запросов.
+    """
+    order_by = (Pet.created_at, Pet.id)
+    pets = await fetch_after(
+        session,
+        select(Pet).where(Pet.user_id == user.id).options(*OVERVIEW_OPTIONS),
+        order_by,
+        page,
+    )
+    result = make_page(pets, order_by, page.limit)
+    result["items"] = await _overviews(session, result["items"], upcoming)
+    return fast_json(Page[PetOverview], result)
 
 
 @router.post("", response_model=PetRead)
+@query_budget(3)
 async def create_pet(
     data: PetCreate,
     session: AsyncSession = Depends(get_session),
@@ -29,52 +98,96 @@ async def create_pet(
 ):
     pet = Pet(user_id=user.id, **data.model_dump())
     session.add(pet)
+    await bump_version(session, user.id)
     await session.commit()
-    await session.refresh(pet)
+    await change_bus.publish(user.id, "pet", "created", pet.id, pet.id)
     return pet
 
 
 @router.get("/{pet_id}", response_model=PetRead)
+@query_budget(3)
 async def get_pet(
     pet_id: str,
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    pet = await get_owned_pet(session, pet_id, user.id)
+    cond.check()
     return pet
 
 
+@router.get("/{pet_id}/overview", response_model=PetOverview)
+@query_budget(8)
+async def get_overview(
+    pet_id: str,
+    upcoming: int = Query(5, ge=0, le=50),
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    """
+    Питомец, предпочтения, привычки, медкарта и ближайшие события
+    за один HTTP-запрос.
+    """
+    result = await session.execute(
+        select(Pet)
+        .where(Pet.id == pet_id, Pet.user_id == user.id)
+        .options(*OVERVIEW_OPTIONS)
+    )
+    pet = result.scalar_one_or_none()
+    if not pet:
+        raise HTTPException(status_code=404, detail="Pet not found")
+
+    return (await _overviews(session, [pet], upcoming))[0]
+
+
 @router.put("/{pet_id}", response_model=PetRead)
+@query_budget(6)
 async def update_pet(
     pet_id: str,
     data: PetUpdate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    pet = await get_owned_pet(session, pet_id, user.id)
+    species = pet.species
 
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(pet, key, value)
 
+    if pet.species != species:
+        await species_changed(session, pet)
+
+    await bump_version(session, user.id)
     await session.commit()
-    await session.refresh(pet)
+    await change_bus.publish(user.id, "pet", "updated", pet.id, pet.id)
     return pet
 
 
 @router.delete("/{pet_id}")
+@query_budget(13)
 async def delete_pet(
     pet_id: str,
+    background: bool = Query(
+        False, description="Удалить в фоне независимо от размера истории"
+    ),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    await ensure_pet_access(session, pet_id, user.id)
+
+    if not background and not pet_deleter.deleting(pet_id):
+        events = await count_events(session, pet_id)
+        background = events > settings.pet_delete_background_threshold
+
+    if background or pet_deleter.deleting(pet_id):
+        # Большая история: не держим одну длинную транзакцию
+        pet_deleter.start(user.id, pet_id)
+        return JSONResponse({"status": "deleting"}, status_code=202)
 
-    await session.delete(pet)
+    await purge_pet(session, pet_id)
+    await bump_version(session, user.id)
     await session.commit()
+    forget_pet(pet_id)
+    await change_bus.publish(user.id, "pet", "deleted", pet_id, pet_id)
     return {"status": "deleted"}
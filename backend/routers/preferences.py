@@ -3,22 +3,27 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from db import get_session
-from models import Preference, Pet
+from models import Preference
 from schemas import PreferenceRead, PreferenceUpdate
 from auth import current_user
+from changes import change_bus
+from versions import Conditional, bump_version, conditional_get
+from access import ensure_pet_access, pet_writes
+from telemetry import query_budget
 
 router = APIRouter(prefix="/pets/{pet_id}/preferences", tags=["Preferences"])
 
 
 @router.get("", response_model=PreferenceRead)
+@query_budget(4)
 async def get_preferences(
     pet_id: str,
+    cond: Conditional = Depends(conditional_get),
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    await ensure_pet_access(session, pet_id, user.id)
+    cond.check()
 
     result = await session.execute(
         select(Preference).where(Preference.pet_id == pet_id)
@@ -31,15 +36,14 @@ async def get_preferences(
 
 
 @router.put("", response_model=PreferenceRead)
+@query_budget(5)
 async def update_preferences(
     pet_id: str,
     data: PreferenceUpdate,
     session: AsyncSession = Depends(get_session),
     user=Depends(current_user),
 ):
-    pet = await session.get(Pet, pet_id)
-    if not pet or pet.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Pet not found")
+    await ensure_pet_access(session, pet_id, user.id)
 
     result = await session.execute(
         select(Preference).where(Preference.pet_id == pet_id)
@@ -53,6 +57,8 @@ async def update_preferences(
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(pref, key, value)
 
-    await session.commit()
-    await session.refresh(pref)
+    async with pet_writes(session, pet_id):
+        await bump_version(session, user.id)
+        await session.commit()
+    await change_bus.publish(user.id, "preference", "updated", pref.id, pet_id)
     return pref
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import current_user
+from db import get_session
+from pagination import PageParams, page_params
+from responses import fast_json
+from schemas import Page, SearchHit
+from search import search
+from telemetry import query_budget
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("", response_model=Page[SearchHit])
+@query_budget(8)
+async def search_all(
+    q: str = Query(..., min_length=2, max_length=200),
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+):
+    """
+    Поиск по заметкам питомцев, предпочтениям, привычкам, медкарте
+    и событиям пользователя. Сначала самые релевантные.
+    """
+    return fast_json(Page[SearchHit], await search(session, user.id, q, page))
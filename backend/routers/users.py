@@ -1,7 +1,7 @@
-from auth import fastapi_users
+from auth import fastapi_users_uncached
 from schemas import UserRead, UserUpdate
 
-router = fastapi_users.get_users_router(
+router = fastapi_users_uncached.get_users_router(
     UserRead,
     UserUpdate,
 )
@@ -1,9 +1,44 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Generic, Literal, TypeVar
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from fastapi_users import schemas as fa_schemas
 
+from helpers import naive_utc
+
+T = TypeVar("T")
+
+
+# ======================================================
+# Пагинация
+# ======================================================
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+    has_more: bool = False
+
+
+# ======================================================
+# Массовое создание
+# ======================================================
+
+class BulkCreate(BaseModel):
+    items: list[dict] = Field(min_length=1, max_length=1000)
+    # True — всё или ничего; False — частичный успех с ошибками по элементам
+    atomic: bool = True
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkCreateResult(BaseModel):
+    created: list[str]
+    errors: list[BulkItemError] = []
+
 
 # ======================================================
 # Пользователь (fastapi-users)
@@ -137,31 +172,94 @@ class HealthRecordRead(HealthRecordBase):
         from_attributes = True
 
 
+class DueRead(BaseModel):
+    """Срок следующей прививки / обработки."""
+
+    pet_id: str
+    pet_name: str | None = None
+    kind: str
+    title: str
+    record_id: str
+    last_date: date
+    due_date: date
+    days_left: int
+    overdue: bool
+
+
 # ======================================================
 # События календаря
 # ======================================================
 
-class EventBase(BaseModel):
+class RecurrenceRule(BaseModel):
+    """Подмножество RRULE: FREQ, INTERVAL, UNTIL, COUNT, EXDATE."""
+
+    freq: Literal["daily", "weekly"]
+    interval: int = Field(1, ge=1, le=365)
+    until: datetime | None = None
+    count: int | None = Field(None, ge=1, le=10_000)
+    exdates: list[datetime] = []
+
+    @field_validator("until")
+    @classmethod
+    def _naive_until(cls, value: datetime | None) -> datetime | None:
+        return naive_utc(value) if value else value
+
+    @field_validator("exdates")
+    @classmethod
+    def _naive_exdates(cls, value: list[datetime]) -> list[datetime]:
+        return [naive_utc(v) for v in value]
+
+    @model_validator(mode="after")
+    def _until_or_count(self):
+        if self.until and self.count:
+            raise ValueError("until and count are mutually exclusive")
+        return self
+
+
+class EventDatetimes(BaseModel):
+    @field_validator("start_at", "end_at", mode="before", check_fields=False)
+    @classmethod
+    def _empty_as_none(cls, value):
+        # Форма на фронте отправляет пустую строку вместо null
+        return None if value == "" else value
+
+    @field_validator("start_at", "end_at", check_fields=False)
+    @classmethod
+    def _naive_utc(cls, value: datetime | None) -> datetime | None:
+        return naive_utc(value) if value else value
+
+
+class EventBase(EventDatetimes):
     type: str                 # feeding / walk / vet_visit
     title: str
-    start_at: str
-    end_at: str | None = None
+    start_at: datetime
+    end_at: datetime | None = None
     location: str | None = None
     notes: str | None = None
+    recurrence: RecurrenceRule | None = None
 
 
 class EventCreate(EventBase):
     pet_id: str
 
 
-class EventUpdate(BaseModel):
+class EventUpdate(EventDatetimes):
     type: str | None = None
     title: str | None = None
-    start_at: str | None = None
-    end_at: str | None = None
+    start_at: datetime | None = None
+    end_at: datetime | None = None
     location: str | None = None
     notes: str | None = None
     status: str | None = None
+    recurrence: RecurrenceRule | None = None
+
+    @field_validator("type", "title", "start_at", "status")
+    @classmethod
+    def _not_null(cls, value):
+        # Поле можно не передавать, но не обнулять: в events оно NOT NULL
+        if value is None:
+            raise ValueError("must not be null")
+        return value
 
 
 class EventRead(EventBase):
@@ -169,11 +267,66 @@ class EventRead(EventBase):
     pet_id: str
     status: str
     created_at: datetime
+    # Заполнено у развёрнутых повторений серии
+    occurrence_at: datetime | None = None
 
     class Config:
         from_attributes = True
 
 
+class SummaryCounts(BaseModel):
+    total: int = 0
+    planned: int = 0
+    done: int = 0
+    cancelled: int = 0
+    by_type: dict[str, int] = {}
+
+
+class SummaryBucket(SummaryCounts):
+    start: date  # день или понедельник недели (UTC)
+
+
+class EventSummary(BaseModel):
+    group_by: Literal["day", "week"]
+    buckets: list[SummaryBucket]  # только непустые, по возрастанию start
+    totals: SummaryCounts
+
+
+class EventOccurrenceUpdate(BaseModel):
+    occurrence_at: datetime
+    status: Literal["planned", "done", "cancelled"]
+
+    @field_validator("occurrence_at")
+    @classmethod
+    def _naive_utc(cls, value: datetime) -> datetime:
+        return naive_utc(value)
+
+
+# ======================================================
+# Сводка по питомцу
+# ======================================================
+
+class PetOverview(PetRead):
+    preferences: PreferenceRead | None = None
+    habits: list[HabitRead] = []
+    health_records: list[HealthRecordRead] = []
+    upcoming_events: list[EventRead] = []
+
+
+# ======================================================
+# Поиск
+# ======================================================
+
+class SearchHit(BaseModel):
+    entity: Literal["pet", "preference", "habit", "health_record", "event"]
+    id: str
+    pet_id: str
+    title: str
+    field: str | None = None  # поле, из которого взят фрагмент
+    snippet: str
+    score: float
+
+
 # ======================================================
 # Ветеринарные клиники
 # ======================================================
@@ -186,6 +339,7 @@ class ClinicRead(BaseModel):
     lat: float | None
     lng: float | None
     source: str | None
+    distance_m: float | None = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,329 @@
+import heapq
+import math
+import re
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import LRUCache
+from config import settings
+from db import Base
+from models import Event, EventArchive, Habit, HealthRecord, Pet, Preference
+from pagination import PageParams, decode_values, encode_cursor
+from versions import current_version
+
+
+# =========================
+# Sources
+# =========================
+
+@dataclass(frozen=True)
+class Source:
+    entity: str
+    model: type[Base]
+    fields: tuple[str, ...]  # колонки FULLTEXT-индекса, в этом порядке
+    title: str | None        # None — заголовком служит имя питомца
+
+    @property
+    def index_name(self) -> str:
+        return f"ft_{self.model.__tablename__}_search"
+
+
+SOURCES = (
+    Source("pet", Pet, ("name", "notes"), "name"),
+    Source("preference", Preference, ("likes", "dislikes", "food_notes"), None),
+    Source("habit", Habit, ("title", "description"), "title"),
+    Source("health_record", HealthRecord, ("title", "details"), "title"),
+    Source("event", Event, ("title", "notes"), "title"),
+    Source("event", EventArchive, ("title", "notes"), "title"),
+)
+
+
+# =========================
+# Tokens
+# =========================
+
+TOKEN = re.compile(r"\w+")
+
+# Частые окончания русских слов, от длинных к коротким: «бешенства»
+# и «бешенство» дают одну основу. Грубо, но без словарей.
+ENDINGS = sorted(
+    set(
+        "иями ями ами ией ого его ому ему ыми ими ой ей ий ый ая яя ое ее "
+        "ую юю ов ев ах ях ам ям ом ем ию ия ие ые а я ы и у ю о е ь й".split()
+    ),
+    key=len,
+    reverse=True,
+)
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    word = word.lower().replace("ё", "е")
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def terms(text: str | None) -> list[str]:
+    return [stem(token) for token in TOKEN.findall(text or "")]
+
+
+def query_terms(q: str) -> list[str]:
+    # Короче MIN_STEM — шум (и MySQL их всё равно не индексирует)
+    return list(dict.fromkeys(term for term in terms(q) if len(term) >= MIN_STEM))
+
+
+def snippet(texts: dict[str, str | None], wanted: tuple[str, ...], width: int = 120):
+    """(поле, фрагмент вокруг первого совпадения)."""
+    for name, value in texts.items():
+        if not value:
+            continue
+        for found in TOKEN.finditer(value):
+            if stem(found.group()).startswith(wanted):
+                start = max(0, found.start() - width // 3)
+                end = min(len(value), start + width)
+                return name, (
+                    ("…" if start else "")
+                    + value[start:end].strip()
+                    + ("…" if end < len(value) else "")
+                )
+
+    name, value = next(
+        ((name, value) for name, value in texts.items() if value), (None, "")
+    )
+    return name, value[:width] + ("…" if len(value) > width else "")
+
+
+# =========================
+# Hits and ordering
+# =========================
+
+@dataclass
+class Hit:
+    entity: str
+    id: str
+    pet_id: str
+    title: str
+    texts: dict[str, str | None] = field(repr=False)
+    score: float = 0.0
+
+    @property
+    def key(self) -> tuple:
+        # Порядок выдачи: релевантность по убыванию, затем (entity, id)
+        return (-self.score, self.entity, self.id)
+
+
+def _after_key(hit: Hit, cursor: tuple | None) -> bool:
+    return cursor is None or hit.key > cursor
+
+
+def _page(hits: list[Hit], limit: int, wanted: tuple[str, ...]) -> dict:
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    items = []
+    for hit in hits:
+        field_name, text = snippet(hit.texts, wanted)
+        items.append(
+            {
+                "entity": hit.entity,
+                "id": hit.id,
+                "pet_id": hit.pet_id,
+                "title": hit.title,
+                "field": field_name,
+                "snippet": text,
+                "score": round(hit.score, 4),
+            }
+        )
+
+    next_cursor = None
+    if has_more:
+        last = hits[-1]
+        next_cursor = encode_cursor([last.score, last.entity, last.id])
+    return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+
+
+def _cursor_key(page: PageParams) -> tuple | None:
+    if not page.cursor:
+        return None
+    score, entity, entity_id = decode_values(page.cursor, 3)
+    return (-float(score), entity, entity_id)
+
+
+# =========================
+# MySQL: FULLTEXT
+# =========================
+
+def _source_columns(source: Source):
+    model = source.model
+    title = getattr(model, source.title) if source.title else Pet.name
+    pet_id = Pet.id if model is Pet else model.pet_id
+    return title, pet_id, [getattr(model, name) for name in source.fields]
+
+
+async def _search_fulltext(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    wanted: list[str],
+    page: PageParams,
+) -> list[Hit]:
+    # Булев режим с префиксами: «бешенств*» находит все формы слова
+    against = " ".join(f"{term}*" for term in wanted)
+    cursor = _cursor_key(page)
+
+    hits = []
+    for source in SOURCES:
+        title, pet_id, columns = _source_columns(source)
+        score = match(*columns, against=against).in_boolean_mode()
+
+        stmt = select(source.model.id, pet_id, title, *columns, score.label("score"))
+        if source.model is not Pet:
+            stmt = stmt.join(Pet, Pet.id == source.model.pet_id)
+        stmt = stmt.where(Pet.user_id == user_id, score > 0)
+
+        if cursor is not None:
+            # Keyset по (-score, entity, id); entity у источника постоянна
+            last_score, last_entity, last_id = -cursor[0], cursor[1], cursor[2]
+            if source.entity > last_entity:
+                stmt = stmt.where(score <= last_score)
+            elif source.entity == last_entity:
+                stmt = stmt.where(
+                    or_(
+                        score < last_score,
+                        and_(score == last_score, source.model.id > last_id),
+                    )
+                )
+            else:
+                stmt = stmt.where(score < last_score)
+
+        result = await session.execute(
+            stmt.order_by(score.desc(), source.model.id).limit(page.limit + 1)
+        )
+        for row in result:
+            hits.append(
+                Hit(
+                    entity=source.entity,
+                    id=row[0],
+                    pet_id=row[1],
+                    title=row[2],
+                    texts=dict(zip(source.fields, row[3:-1])),
+                    score=float(row[-1]),
+                )
+            )
+
+    return heapq.nsmallest(page.limit + 1, hits, key=lambda hit: hit.key)
+
+
+# =========================
+# SQLite: in-process inverted index
+# =========================
+
+class InvertedIndex:
+    """
+    Инвертированный индекс по данным одного пользователя:
+    терм -> {(entity, id): tf}. Ранжирование — tf-idf.
+    """
+
+    def __init__(self):
+        self.docs: dict[tuple[str, str], Hit] = {}
+        self.postings: dict[str, dict[tuple[str, str], int]] = defaultdict(dict)
+
+    def add(self, hit: Hit) -> None:
+        key = (hit.entity, hit.id)
+        self.docs[key] = hit
+        counts = Counter(
+            term for value in hit.texts.values() for term in terms(value)
+        )
+        for term, count in counts.items():
+            self.postings[term][key] = count
+
+    def search(self, wanted: list[str]) -> list[Hit]:
+        scores: dict[tuple[str, str], float] = defaultdict(float)
+        total = len(self.docs)
+        for term in wanted:
+            # Префикс, как term* в MySQL
+            for indexed, docs in self.postings.items():
+                if not indexed.startswith(term):
+                    continue
+                idf = math.log(1 + total / len(docs))
+                for key, count in docs.items():
+                    scores[key] += (1 + math.log(count)) * idf
+
+        hits = []
+        for key, score in scores.items():
+            doc = self.docs[key]
+            hits.append(
+                Hit(doc.entity, doc.id, doc.pet_id, doc.title, doc.texts, score)
+            )
+        return sorted(hits, key=lambda hit: hit.key)
+
+
+# user_id -> (версия данных, индекс). Любая запись пользователя
+# увеличивает версию (bump_version), и индекс перестраивается.
+user_indexes = LRUCache(settings.search_index_cache_size)
+
+
+async def _build_index(session: AsyncSession, user_id: uuid.UUID) -> InvertedIndex:
+    index = InvertedIndex()
+    for source in SOURCES:
+        title, pet_id, columns = _source_columns(source)
+        stmt = select(source.model.id, pet_id, title, *columns)
+        if source.model is not Pet:
+            stmt = stmt.join(Pet, Pet.id == source.model.pet_id)
+
+        result = await session.execute(stmt.where(Pet.user_id == user_id))
+        for row in result:
+            index.add(
+                Hit(
+                    entity=source.entity,
+                    id=row[0],
+                    pet_id=row[1],
+                    title=row[2],
+                    texts=dict(zip(source.fields, row[3:])),
+                )
+            )
+    return index
+
+
+async def _search_in_memory(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    wanted: list[str],
+    page: PageParams,
+) -> list[Hit]:
+    version = await current_version(session, user_id)
+    cached = user_indexes.get(user_id)
+    if cached is None or cached[0] != version:
+        cached = (version, await _build_index(session, user_id))
+        user_indexes.set(user_id, cached)
+
+    cursor = _cursor_key(page)
+    hits = (hit for hit in cached[1].search(wanted) if _after_key(hit, cursor))
+    return [hit for _, hit in zip(range(page.limit + 1), hits)]
+
+
+# =========================
+# Entry point
+# =========================
+
+async def search(
+    session: AsyncSession, user_id: uuid.UUID, q: str, page: PageParams
+) -> dict:
+    """
+    Ранжированный поиск по данным пользователя. Страница в формате Page[SearchHit].
+    """
+    wanted = query_terms(q)
+    if not wanted:
+        return {"items": [], "next_cursor": None, "has_more": False}
+
+    if session.bind.dialect.name == "mysql":
+        hits = await _search_fulltext(session, user_id, wanted, page)
+    else:
+        hits = await _search_in_memory(session, user_id, wanted, page)
+    return _page(hits, page.limit, tuple(wanted))
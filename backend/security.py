@@ -1,8 +1,21 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from fastapi_users.password import PasswordHelper
 from passlib.context import CryptContext
 
+from config import settings
+
+# bcrypt оставлен для проверки старых хэшей: deprecated="auto"
+# помечает их (и argon2 с другими параметрами) на перехэширование
 pwd_context = CryptContext(
-    schemes=["argon2"],
+    schemes=["argon2", "bcrypt"],
     deprecated="auto",
+    argon2__time_cost=settings.argon2_time_cost,
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__parallelism=settings.argon2_parallelism,
 )
 
 def get_password_hash(password: str) -> str:
@@ -10,3 +23,77 @@ def get_password_hash(password: str) -> str:
 
 def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
+
+
+# =========================
+# Async password helper
+# =========================
+
+# (пароль, готовый хэш), посчитанный заранее в пуле
+_prehashed: ContextVar[tuple[str, str] | None] = ContextVar(
+    "prehashed", default=None
+)
+
+
+class AsyncPasswordHelper(PasswordHelper):
+    """
+    Argon2 в ограниченном пуле потоков вместо event loop
+    (argon2-cffi отпускает GIL на время хэширования).
+
+    fastapi-users вызывает hash() синхронно, поэтому UserManager
+    оборачивает такие вызовы в prehashed(): хэш считается в пуле заранее,
+    а hash() только забирает готовый результат.
+
+    executor=None — хэширование прямо в event loop.
+    """
+
+    def __init__(
+        self, context: CryptContext, executor: ThreadPoolExecutor | None
+    ) -> None:
+        super().__init__(context)
+        self.executor = executor
+
+    async def _run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update_async(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(
+            self.context.verify_and_update, plain_password, hashed_password
+        )
+
+    @asynccontextmanager
+    async def prehashed(self, password: str | None):
+        if password is None:
+            yield
+            return
+
+        token = _prehashed.set((password, await self.hash_async(password)))
+        try:
+            yield
+        finally:
+            _prehashed.reset(token)
+
+    def hash(self, password: str) -> str:
+        prehashed = _prehashed.get()
+        if prehashed is not None and prehashed[0] == password:
+            return prehashed[1]
+        return super().hash(password)
+
+
+password_helper = AsyncPasswordHelper(
+    pwd_context,
+    ThreadPoolExecutor(
+        max_workers=settings.password_hash_workers,
+        thread_name_prefix="password-hash",
+    )
+    if settings.password_hash_workers > 0
+    else None,
+)
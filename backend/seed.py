@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from clinic_cache import clinic_cache
 from models import (
     User,
     Pet,
@@ -13,13 +14,12 @@ from models import (
     Event,
     Clinic,
 )
-from security import pwd_context
+from security import password_helper
 
 
 async def seed_test_data(session: AsyncSession) -> None:
     # Проверяем, есть ли пользователи
-    result = await session.execute(select(User))
-    if result.scalars().first():
+    if await session.scalar(select(User.id).limit(1)) is not None:
         return  # данные уже есть, ничего не делаем
 
     # ------------------------
@@ -28,7 +28,7 @@ async def seed_test_data(session: AsyncSession) -> None:
     user = User(
         id=uuid.uuid4(),
         email="test@petify.dev",
-        hashed_password=pwd_context.hash("Test12345"),
+        hashed_password=await password_helper.hash_async("Test12345"),
         is_active=True,
         is_superuser=False,
         is_verified=True,
@@ -111,14 +111,14 @@ async def seed_test_data(session: AsyncSession) -> None:
                 pet_id=pet1.id,
                 title="Кормление",
                 type="feeding",
-                start_at=(datetime.utcnow() + timedelta(hours=1)).isoformat(),
+                start_at=datetime.utcnow() + timedelta(hours=1),
                 status="planned",
             ),
             Event(
                 pet_id=pet2.id,
                 title="Прогулка",
                 type="walk",
-                start_at=(datetime.utcnow() + timedelta(hours=2)).isoformat(),
+                start_at=datetime.utcnow() + timedelta(hours=2),
                 status="planned",
             ),
         ]
@@ -145,3 +145,4 @@ async def seed_test_data(session: AsyncSession) -> None:
     )
 
     await session.commit()
+    await clinic_cache.invalidate(session)
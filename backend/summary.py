@@ -0,0 +1,115 @@
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from archive import reaches_archive
+from models import Event, EventArchive, Pet
+from recurrence import expand_series, window_series
+
+STATUSES = ("planned", "done", "cancelled")
+
+
+class _Counts:
+    __slots__ = ("total", "by_status", "by_type")
+
+    def __init__(self):
+        self.total = 0
+        self.by_status = defaultdict(int)
+        self.by_type = defaultdict(int)
+
+    def add(self, type_: str, status: str, count: int) -> None:
+        self.total += count
+        self.by_status[status] += count
+        self.by_type[type_] += count
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            **{status: self.by_status.get(status, 0) for status in STATUSES},
+            "by_type": dict(self.by_type),
+        }
+
+
+def _as_date(value) -> date:
+    # SQLite отдаёт DATE() строкой, MySQL — датой
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _bucket_start(day: date, group_by: str) -> date:
+    return day - timedelta(days=day.weekday()) if group_by == "week" else day
+
+
+def _day_counts(
+    model: type[Event | EventArchive],
+    user_id: uuid.UUID,
+    window_start: datetime,
+    window_end: datetime,
+    pet_id: str | None,
+):
+    day = func.date(model.start_at)
+    stmt = (
+        select(day, model.type, model.status, func.count())
+        .join(Pet)
+        .where(
+            Pet.user_id == user_id,
+            model.recurrence.is_(None),
+            model.start_at >= window_start,
+            model.start_at < window_end,
+        )
+        .group_by(day, model.type, model.status)
+    )
+    if pet_id:
+        stmt = stmt.where(model.pet_id == pet_id)
+    return stmt
+
+
+async def summarize(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    window_start: datetime,
+    window_end: datetime,
+    group_by: str,
+    pet_id: str | None = None,
+) -> dict:
+    """
+    Число событий окна [window_start, window_end) по дням или неделям
+    (UTC, неделя с понедельника), типам и статусам. Ответ в формате EventSummary.
+
+    Разовые события считает один GROUP BY по дню start_at (range scan
+    ix_events_pet_start по питомцам пользователя) и такой же по архиву,
+    если окно начинается раньше его порога; повторения серий
+    разворачиваются в памяти, как в list_events. Размер ответа зависит
+    от числа дней окна, а не от числа событий.
+    """
+    stmt = select(Event).join(Pet).where(Pet.user_id == user_id)
+    if pet_id:
+        stmt = stmt.where(Event.pet_id == pet_id)
+
+    buckets: dict[date, _Counts] = defaultdict(_Counts)
+    totals = _Counts()
+
+    tables = [Event, EventArchive] if reaches_archive(window_start) else [Event]
+    for model in tables:
+        for value, type_, status, count in await session.execute(
+            _day_counts(model, user_id, window_start, window_end, pet_id)
+        ):
+            buckets[_bucket_start(_as_date(value), group_by)].add(type_, status, count)
+            totals.add(type_, status, count)
+
+    series, overrides = await window_series(session, stmt, window_start, window_end)
+    for item in expand_series(series, overrides, window_start, window_end):
+        buckets[_bucket_start(item.start_at.date(), group_by)].add(
+            item.type, item.status, 1
+        )
+        totals.add(item.type, item.status, 1)
+
+    return {
+        "group_by": group_by,
+        "buckets": [
+            {"start": start, **buckets[start].as_dict()} for start in sorted(buckets)
+        ],
+        "totals": totals.as_dict(),
+    }
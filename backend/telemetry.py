@@ -0,0 +1,327 @@
+import logging
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from cache import LRUCache
+from config import settings
+from db import MeteredPool
+from metrics import Histogram
+
+slow_log = logging.getLogger("petify.slow_query")
+budget_log = logging.getLogger("petify.query_budget")
+
+# Корзины для числа запросов к БД на один HTTP-запрос
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+UNMATCHED = "<unmatched>"
+
+
+@dataclass
+class RequestStats:
+    """SQL-статистика одного HTTP-запроса."""
+
+    scope: dict
+    queries: int = 0
+    sql_seconds: float = 0.0
+    # Тексты запросов — только в режиме бюджетов
+    statements: list[str] | None = None
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return route.path if route is not None else UNMATCHED
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+@dataclass
+class RouteMetrics:
+    latency: Histogram = field(default_factory=Histogram)
+    queries: Histogram = field(default_factory=lambda: Histogram(QUERY_BUCKETS))
+    sql_seconds: Histogram = field(default_factory=Histogram)
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+
+# (method, шаблон маршрута) -> метрики
+routes: dict[tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+
+
+# =========================
+# SQL events
+# =========================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append(statement)
+
+    if elapsed * 1000 >= settings.slow_query_ms:
+        slow_log.warning(
+            "%.1f ms route=%s sql=%s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            " ".join(statement.split())[:1000],
+        )
+
+
+def _handle_error(context):
+    # after_cursor_execute не вызывается при ошибке — снимаем отметку сами
+    if context.connection is not None and context.execution_context is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+# =========================
+# Query budgets
+# =========================
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries: int | None, allow_repeats: bool = False):
+    """
+    Максимум SQL-запросов на один вызов эндпоинта, включая зависимости
+    (пользователь без кэша, проверка владения). Проверяется, когда
+    QUERY_BUDGET_MODE=warn|raise. None — без лимита; allow_repeats —
+    для пакетной обработки, где повтор запроса не N+1.
+
+        @router.get("/{pet_id}")
+        @query_budget(3)
+        async def get_pet(...): ...
+    """
+
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        endpoint.query_allow_repeats = allow_repeats
+        return endpoint
+
+    return decorator
+
+
+def budget_violations(stats: RequestStats) -> list[str]:
+    problems = []
+
+    endpoint = getattr(stats.scope.get("route"), "endpoint", None)
+    budget = getattr(endpoint, "query_budget", None)
+    if budget is not None and stats.queries > budget:
+        problems.append(f"{stats.queries} queries, budget {budget}")
+
+    if getattr(endpoint, "query_allow_repeats", False):
+        return problems
+
+    repeats = Counter(stats.statements)
+    for statement, count in repeats.items():
+        if count >= settings.query_repeat_threshold:
+            problems.append(f"N+1: {count}x {' '.join(statement.split())[:200]}")
+    return problems
+
+
+def budget_report(stats: RequestStats) -> str | None:
+    """Текст нарушения бюджета или None, если нарушений нет."""
+    problems = budget_violations(stats)
+    if not problems:
+        return None
+
+    return "\n".join(
+        [
+            f"{stats.scope['method']} {stats.route}",
+            *(f"  {problem}" for problem in problems),
+            "  statements:",
+            *(f"    {' '.join(statement.split())[:300]}" for statement in stats.statements),
+        ]
+    )
+
+
+def check_budget(stats: RequestStats) -> None:
+    message = budget_report(stats)
+    if message is None:
+        return
+    if settings.query_budget_mode == "raise":
+        raise QueryBudgetExceeded(message)
+    budget_log.warning(message)
+
+
+# =========================
+# Middleware
+# =========================
+
+def _event_stream(start: dict) -> bool:
+    return any(
+        name == b"content-type" and value.startswith(b"text/event-stream")
+        for name, value in start.get("headers", ())
+    )
+
+
+class MetricsMiddleware:
+    """
+    Чистый ASGI-middleware: латентность и статусы по шаблону маршрута,
+    число и время SQL-запросов на HTTP-запрос.
+
+    Потоки Server-Sent Events учитываются только в статусах: время жизни
+    соединения — не латентность запроса.
+
+    QUERY_BUDGET_MODE=raise: заголовки ответа придерживаются до последнего
+    куска тела, и при превышении бюджета клиент вместо ответа получает 500
+    с отчётом (QueryBudgetExceeded пробрасывается дальше). Если тело
+    отдаётся частями, бюджет проверяется после ответа — тогда только
+    исключение в логе сервера.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        if settings.query_budget_mode != "off":
+            stats.statements = []
+        enforce = settings.query_budget_mode == "raise"
+        token = _current.set(stats)
+        status = 500
+        streaming = False
+        checked = False
+        held: dict | None = None
+
+        async def send_wrapper(message):
+            nonlocal status, streaming, checked, held
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = _event_stream(message)
+                if enforce and not streaming:
+                    held = message
+                    return
+            elif held is not None and message["type"] == "http.response.body":
+                start, held = held, None
+                if not message.get("more_body", False):
+                    checked = True
+                    report = budget_report(stats)
+                    if report is not None:
+                        status = 500
+                        await send(
+                            {
+                                "type": "http.response.start",
+                                "status": 500,
+                                "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+                            }
+                        )
+                        await send({"type": "http.response.body", "body": report.encode()})
+                        raise QueryBudgetExceeded(report)
+                await send(start)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+
+            metrics = routes[(scope["method"], stats.route)]
+            if not streaming:
+                metrics.latency.observe(elapsed)
+                metrics.queries.observe(stats.queries)
+                metrics.sql_seconds.observe(stats.sql_seconds)
+            metrics.statuses[status] += 1
+
+        if stats.statements is not None and not checked:
+            check_budget(stats)
+
+
+# =========================
+# Prometheus text format
+# =========================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _histogram(lines: list[str], name: str, histogram: Histogram, **labels) -> None:
+    for le, count in histogram.cumulative():
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+def _header(lines: list[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render(engines: dict[str, AsyncEngine], caches: dict[str, LRUCache]) -> str:
+    lines: list[str] = []
+    snapshot = sorted(routes.items())
+
+    _header(lines, "petify_requests_total", "counter", "HTTP requests by route and status")
+    for (method, route), metrics in snapshot:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(
+                f"petify_requests_total{_labels(method=method, route=route, status=status)} {count}"
+            )
+
+    for name, attr, help_text in (
+        ("petify_request_duration_seconds", "latency", "HTTP request latency"),
+        ("petify_request_queries", "queries", "SQL statements per HTTP request"),
+        ("petify_request_sql_seconds", "sql_seconds", "SQL time per HTTP request"),
+    ):
+        _header(lines, name, "histogram", help_text)
+        for (method, route), metrics in snapshot:
+            _histogram(lines, name, getattr(metrics, attr), method=method, route=route)
+
+    pools = {
+        name: engine.pool
+        for name, engine in engines.items()
+        if isinstance(engine.pool, MeteredPool)
+    }
+
+    _header(lines, "petify_db_pool_connections", "gauge", "DB pool connections by state")
+    for name, pool in pools.items():
+        for state, value in (
+            ("checked_out", pool.checkedout()),
+            ("checked_in", pool.checkedin()),
+            ("overflow", max(pool.overflow(), 0)),
+        ):
+            lines.append(f"petify_db_pool_connections{_labels(pool=name, state=state)} {value}")
+
+    _header(lines, "petify_db_pool_timeouts_total", "counter", "DB pool checkout timeouts")
+    for name, pool in pools.items():
+        lines.append(f"petify_db_pool_timeouts_total{_labels(pool=name)} {pool.timeouts}")
+
+    _header(lines, "petify_db_pool_wait_seconds", "histogram", "DB pool checkout wait")
+    for name, pool in pools.items():
+        _histogram(lines, "petify_db_pool_wait_seconds", pool.wait, pool=name)
+
+    _header(lines, "petify_cache_requests_total", "counter", "In-process cache lookups")
+    for cache, lru in caches.items():
+        lines.append(f"petify_cache_requests_total{_labels(cache=cache, result='hit')} {lru.hits}")
+        lines.append(f"petify_cache_requests_total{_labels(cache=cache, result='miss')} {lru.misses}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,99 @@
+import hashlib
+import uuid
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import current_user
+from db import get_session
+from models import DataVersion
+
+
+async def bump_version(session: AsyncSession, user_id: uuid.UUID) -> None:
+    """
+    Увеличивает версию данных пользователя в текущей транзакции.
+    Вызывать перед commit в каждом create / update / delete.
+    """
+    if session.bind.dialect.name == "mysql":
+        stmt = mysql_insert(DataVersion).values(user_id=user_id, version=1)
+        stmt = stmt.on_duplicate_key_update(version=DataVersion.version + 1)
+    else:
+        stmt = sqlite_insert(DataVersion).values(user_id=user_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DataVersion.user_id],
+            set_={"version": DataVersion.version + 1},
+        )
+    await session.execute(stmt)
+
+
+async def current_version(session: AsyncSession, user_id: uuid.UUID) -> int:
+    version = await session.scalar(
+        select(DataVersion.version).where(DataVersion.user_id == user_id)
+    )
+    return version or 0
+
+
+# =========================
+# Conditional GET
+# =========================
+
+@dataclass
+class Conditional:
+    etag: str
+    matched: bool = False
+
+    @property
+    def headers(self) -> dict:
+        # no-cache: браузер хранит ответ, но всегда перепроверяет по ETag;
+        # Vary: ответ зависит от пользователя, общий кэш не должен его делить
+        return {
+            "ETag": self.etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization",
+        }
+
+    def check(self) -> None:
+        """304, если If-None-Match совпал. Вызывать после проверки доступа."""
+        if self.matched:
+            raise HTTPException(status_code=304, headers=self.headers)
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Слабое сравнение: W/ не учитывается
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(current_user),
+) -> Conditional:
+    """
+    Слабый ETag из версии данных пользователя, его id и URL запроса.
+
+    304 отдаёт не зависимость, а маршрут — вызовом check() после
+    проверки доступа к питомцу / событию и до основного запроса:
+    иначе If-None-Match: * на чужой id получил бы 304 вместо 404.
+
+    Обычные ответы получают заголовки через response; ответы fast_json —
+    через headers=Conditional.headers.
+    """
+    version = await current_version(session, user.id)
+    digest = hashlib.blake2b(
+        f"{user.id}:{request.url.path}?{request.url.query}".encode(), digest_size=8
+    ).hexdigest()
+    etag = f'W/"{version}-{digest}"'
+    conditional = Conditional(
+        etag=etag, matched=_matches(request.headers.get("if-none-match"), etag)
+    )
+
+    response.headers.update(conditional.headers)
+    return conditional
@@ -21,6 +21,25 @@ const baseQuery = async (args, api, extraOptions) => {
   return result
 }
 
+const PAGE_LIMIT = 200
+
+const allPages = (toUrl) => async (arg, api, extraOptions, fetchWithBQ) => {
+  const items = []
+  let cursor = null
+  do {
+    const result = await fetchWithBQ({
+      url: toUrl(arg),
+      params: cursor ? { limit: PAGE_LIMIT, cursor } : { limit: PAGE_LIMIT },
+    })
+    if (result.error) {
+      return { error: result.error }
+    }
+    items.push(...result.data.items)
+    cursor = result.data.next_cursor
+  } while (cursor)
+  return { data: items }
+}
+
 export const api = createApi({
   reducerPath: 'api',
   baseQuery,
@@ -60,7 +79,7 @@ export const api = createApi({
       providesTags: ['User'],
     }),
     listPets: builder.query({
-      query: () => '/pets',
+      queryFn: allPages(() => '/pets'),
       providesTags: ['Pets'],
     }),
     getPet: builder.query({
@@ -111,7 +130,7 @@ export const api = createApi({
       ],
     }),
     listHabits: builder.query({
-      query: (petId) => `/pets/${petId}/habits`,
+      queryFn: allPages((petId) => `/pets/${petId}/habits`),
       providesTags: (result, error, petId) => [
         { type: 'Habits', id: petId },
       ],
@@ -134,7 +153,7 @@ export const api = createApi({
       invalidatesTags: ['Habits'],
     }),
     listHealthRecords: builder.query({
-      query: (petId) => `/pets/${petId}/health-records`,
+      queryFn: allPages((petId) => `/pets/${petId}/health-records`),
       providesTags: (result, error, petId) => [
         { type: 'Health', id: petId },
       ],
@@ -165,7 +184,7 @@ export const api = createApi({
       invalidatesTags: ['Health'],
     }),
     listEvents: builder.query({
-      query: () => '/events',
+      queryFn: allPages(() => '/events'),
       providesTags: ['Events'],
     }),
     addEvent: builder.mutation({